@@ -18,9 +18,403 @@ Version: 3.0.0
 Date: October 2025
 """
 
-from typing import List, Dict, Any, Tuple, Optional
-from openai import OpenAI
+from typing import TYPE_CHECKING, List, Dict, Any, Iterator, Tuple, Optional, Set
+import hashlib
+import json
+import os
+import re
+import threading
 import time
+from collections import deque
+
+from log_processor import (
+    calculate_costs,
+    count_prompt_tokens,
+    count_tokens,
+    find_lines_in_file,
+    prune_cache_entries,
+    write_file_atomic,
+)
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# ===============================
+# Chunk Batching Configuration
+# ===============================
+# Upper bound on the combined chunk tokens sent in one batched summarization
+# request. GPT-4.1 is held close to its 30K TPM limit; GPT-5 has a far larger
+# context window and rate limit, so several full-size chunks fit in one call.
+BATCH_TOKEN_BUDGET = {
+    "gpt-5": 200000,
+    "gpt-4.1": 25000,
+}
+DEFAULT_BATCH_TOKEN_BUDGET = 25000
+SEGMENT_MARKER = "<<<SEGMENT {index}>>>"
+
+# Suggested wait in rate limit errors ("... Please try again in 1.5s ...")
+RETRY_AFTER_RE = re.compile(r'try again in ([\d.]+)s')
+
+# ===============================
+# Rate Limit Configuration
+# ===============================
+# Per-minute (tokens, requests) budgets used to pace API calls client-side
+# so requests are spaced by their actual size instead of fixed delays.
+RATE_LIMITS = {
+    "gpt-5": (500000, 500),
+    "gpt-4.1": (30000, 500),
+}
+DEFAULT_RATE_LIMITS = (30000, 500)
+MAX_CONCURRENT_REQUESTS = 4        # Upper bound for requests in flight at once
+CONCURRENCY_INCREASE_AFTER = 4     # Successful requests before the limit grows by one
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that refills continuously over a time period.
+    
+    The bucket starts full with `capacity` units and regains capacity/period
+    units per second. acquire() blocks until the requested amount is
+    available, so callers sharing a bucket are spaced by what they consume.
+    
+    Example:
+        >>> tpm = TokenBucket(30000)        # 30K tokens per minute
+        >>> tpm.acquire(12000)              # returns at once while the bucket is full
+    """
+    
+    def __init__(self, capacity: float, period: float = 60.0):
+        """
+        Args:
+            capacity (float): Maximum units available within one period
+            period (float): Refill period in seconds (default: 60)
+        """
+        self.capacity = capacity
+        self.rate = capacity / period
+        self._level = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, amount: float = 1) -> None:
+        """
+        Block until `amount` units can be taken from the bucket.
+        
+        Args:
+            amount (float): Units to consume (default: 1)
+            
+        Note:
+            - An amount above the capacity waits for a full bucket instead
+              of blocking forever
+        """
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._level >= amount:
+                    self._level -= amount
+                    return
+                wait = (amount - self._level) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    Thread-safe limit on requests in flight, adjusted additive-increase /
+    multiplicative-decrease (AIMD).
+    
+    A rate-limited request halves the limit (down to 1); every
+    `increase_after` successful requests raise it by one again, up to
+    `max_limit`. Callers block in acquire() while the limit is reached.
+    
+    Example:
+        >>> concurrency = AdaptiveConcurrencyLimit(4)
+        >>> concurrency.acquire()
+        >>> concurrency.release(rate_limited=True)
+        >>> concurrency.limit
+        2
+    """
+    
+    def __init__(self, max_limit: int, increase_after: int = CONCURRENCY_INCREASE_AFTER):
+        """
+        Args:
+            max_limit (int): Limit to start at and grow back to
+            increase_after (int): Successes needed before each increase
+        """
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.increase_after = increase_after
+        self._active = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+    
+    def acquire(self) -> None:
+        """Block until a request slot is free, then take it."""
+        with self._condition:
+            while self._active >= self.limit:
+                self._condition.wait()
+            self._active += 1
+    
+    def release(self, rate_limited: bool = False) -> None:
+        """
+        Return a request slot and adjust the limit by the request's outcome.
+        
+        Args:
+            rate_limited (bool): The request was rejected with a rate limit error
+        """
+        with self._condition:
+            self._active -= 1
+            if rate_limited:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self.limit < self.max_limit and self._successes >= self.increase_after:
+                    self.limit += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+
+# ===============================
+# Chunk Sizing Configuration
+# ===============================
+# Smallest and largest chunk sizes (tokens) per model. Chunks start at the
+# smallest size and grow while the measured request latencies predict that a
+# larger chunk still finishes within CHUNK_LATENCY_SLO_SECONDS.
+CHUNK_TOKEN_BOUNDS = {
+    "gpt-5": (80000, 120000),
+    "gpt-4.1": (20000, 27000),
+}
+DEFAULT_CHUNK_TOKEN_BOUNDS = (20000, 27000)
+CHUNK_LATENCY_SLO_SECONDS = 90.0     # Predicted latency a chunk request should stay under
+CHUNK_TPM_HEADROOM = 0.9             # Share of the TPM budget a single request may use
+CHUNK_SIZER_MIN_OBSERVATIONS = 3     # Completed calls needed before latencies are trusted
+CHUNK_SIZER_WINDOW = 50              # Most recent calls used for the latency fit
+
+
+class ChunkSizer:
+    """
+    Pick chunk sizes from the observed latency of completed API calls.
+    
+    Each successful call records (prompt_tokens, elapsed seconds). A least
+    squares fit of latency = intercept + slope * prompt_tokens then gives the
+    largest prompt predicted to finish within CHUNK_LATENCY_SLO_SECONDS,
+    bounded by CHUNK_TOKEN_BOUNDS and by CHUNK_TPM_HEADROOM of the model's
+    tokens-per-minute budget.
+    
+    Example:
+        >>> sizer = get_chunk_sizer("gpt-4.1")
+        >>> sizer.chunk_tokens()            # no calls measured yet
+        20000
+    """
+    
+    def __init__(self, model: str):
+        """
+        Args:
+            model (str): OpenAI model the chunks are sent to
+        """
+        self.min_tokens, self.max_tokens = CHUNK_TOKEN_BOUNDS.get(model, DEFAULT_CHUNK_TOKEN_BOUNDS)
+        self.tokens_per_minute = RATE_LIMITS.get(model, DEFAULT_RATE_LIMITS)[0]
+        self._observations = deque(maxlen=CHUNK_SIZER_WINDOW)
+        self._lock = threading.Lock()
+    
+    def record(self, prompt_tokens: int, elapsed: float) -> None:
+        """
+        Add the measured latency of a completed call.
+        
+        Args:
+            prompt_tokens (int): Tokens sent with the request
+            elapsed (float): Seconds until the response arrived
+        """
+        with self._lock:
+            self._observations.append((prompt_tokens, elapsed))
+    
+    def _fit(self) -> Optional[Tuple[float, float]]:
+        """
+        Fit latency = intercept + slope * prompt_tokens to the recorded calls.
+        
+        Returns:
+            Optional[Tuple[float, float]]: (intercept, slope), or None while
+                fewer than CHUNK_SIZER_MIN_OBSERVATIONS calls are recorded
+        """
+        with self._lock:
+            observations = list(self._observations)
+        if len(observations) < CHUNK_SIZER_MIN_OBSERVATIONS:
+            return None
+        
+        n = len(observations)
+        mean_tokens = sum(tokens for tokens, _ in observations) / n
+        mean_latency = sum(latency for _, latency in observations) / n
+        variance = sum((tokens - mean_tokens) ** 2 for tokens, _ in observations)
+        if variance == 0:
+            # All prompts had the same size: assume latency grows proportionally
+            return 0.0, mean_latency / max(mean_tokens, 1)
+        
+        slope = sum(
+            (tokens - mean_tokens) * (latency - mean_latency) for tokens, latency in observations
+        ) / variance
+        return mean_latency - slope * mean_tokens, slope
+    
+    def chunk_tokens(self, prompt_overhead: int = 0) -> int:
+        """
+        Largest chunk size predicted to stay within latency and TPM limits.
+        
+        Args:
+            prompt_overhead (int): Tokens sent alongside each chunk (system
+                                   prompt and instructions)
+            
+        Returns:
+            int: Chunk size in tokens
+            
+        Note:
+            - Returns the model's minimum chunk size until enough calls have
+              been measured
+        """
+        size = self.min_tokens
+        fit = self._fit()
+        if fit is not None:
+            intercept, slope = fit
+            if slope > 0:
+                size = max(self.min_tokens, int((CHUNK_LATENCY_SLO_SECONDS - intercept) / slope) - prompt_overhead)
+            else:
+                size = self.max_tokens
+        
+        return min(size, self.max_chunk_tokens(prompt_overhead))
+    
+    def max_chunk_tokens(self, prompt_overhead: int = 0) -> int:
+        """
+        Largest chunk size allowed for the model, regardless of latency.
+        
+        Args:
+            prompt_overhead (int): Tokens sent alongside each chunk
+            
+        Returns:
+            int: The model's maximum chunk size, capped by the TPM headroom
+        """
+        tpm_headroom = int(CHUNK_TPM_HEADROOM * self.tokens_per_minute) - prompt_overhead
+        return max(1, min(self.max_tokens, tpm_headroom))
+
+
+# Latency observations are shared by every handler (and session) using a model
+_chunk_sizers: Dict[str, ChunkSizer] = {}
+_chunk_sizers_lock = threading.Lock()
+
+
+def get_chunk_sizer(model: str) -> ChunkSizer:
+    """
+    Return the process-wide ChunkSizer for a model.
+    
+    Args:
+        model (str): OpenAI model name
+        
+    Returns:
+        ChunkSizer: Sizer collecting the latencies of calls to this model
+    """
+    with _chunk_sizers_lock:
+        if model not in _chunk_sizers:
+            _chunk_sizers[model] = ChunkSizer(model)
+        return _chunk_sizers[model]
+
+
+# ===============================
+# Response Cache Configuration
+# ===============================
+# Completed replies are cached on disk by a digest of (model, messages), so
+# re-analyzing identical logs or repeating a question costs no tokens
+RESPONSE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ipe_analyzer")
+RESPONSE_CACHE_TTL_SECONDS = 7 * 86400  # Replies older than a week are requested again
+RESPONSE_CACHE_MAX_ENTRIES = 512        # Oldest replies beyond this are removed
+RESPONSE_CACHE_PRUNE_EVERY = 32         # Stored replies between two pruning scans
+
+_response_cache_stores = 0
+_response_cache_lock = threading.Lock()
+
+
+def response_cache_key(model: str, messages: List[Dict[str, str]]) -> str:
+    """
+    Digest identifying a chat completion request.
+    
+    Args:
+        model (str): Model the request is sent to
+        messages: List of message dictionaries for the chat completion
+        
+    Returns:
+        str: Hex sha256 of the model and messages (system prompt included)
+    """
+    payload = json.dumps({"model": model, "messages": messages}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_cached_reply(key: str) -> Optional[str]:
+    """
+    Load a reply stored by store_cached_reply().
+    
+    Args:
+        key (str): Digest from response_cache_key()
+        
+    Returns:
+        Optional[str]: The cached reply, or None if missing or expired
+    """
+    path = os.path.join(RESPONSE_CACHE_DIR, f"{key}.json")
+    try:
+        if time.time() - os.path.getmtime(path) > RESPONSE_CACHE_TTL_SECONDS:
+            os.remove(path)
+            return None
+        with open(path, encoding="utf-8") as f:
+            reply = json.load(f).get("reply")
+    except (OSError, ValueError, AttributeError):
+        return None
+    return reply if isinstance(reply, str) else None
+
+
+def store_cached_reply(key: str, reply: str):
+    """
+    Cache a reply on disk, pruning the cache every RESPONSE_CACHE_PRUNE_EVERY stores.
+    
+    Args:
+        key (str): Digest from response_cache_key()
+        reply (str): Model response text
+        
+    Note:
+        - Write failures are ignored; the reply is then simply requested again
+        - The first store of a process also prunes, so a cache left over
+          from earlier runs is trimmed early
+    """
+    global _response_cache_stores
+    try:
+        os.makedirs(RESPONSE_CACHE_DIR, exist_ok=True)
+        write_file_atomic(
+            os.path.join(RESPONSE_CACHE_DIR, f"{key}.json"),
+            lambda f: json.dump({"reply": reply}, f)
+        )
+    except OSError:
+        return
+    
+    with _response_cache_lock:
+        prune = _response_cache_stores % RESPONSE_CACHE_PRUNE_EVERY == 0
+        _response_cache_stores += 1
+    if prune:
+        prune_cache_entries(
+            RESPONSE_CACHE_DIR,
+            RESPONSE_CACHE_MAX_ENTRIES,
+            max_age_seconds=RESPONSE_CACHE_TTL_SECONDS,
+            match=lambda entry: entry.name.endswith(".json")
+        )
+
+
+# ===============================
+# Conversation History Configuration
+# ===============================
+# Token budget for the conversation sent with a follow-up question. Every
+# follow-up re-sends the whole history, so once it exceeds the budget the
+# oldest question/answer turns are left out. GPT-4.1 is bounded by its 30K
+# TPM limit rather than its context window.
+HISTORY_TOKEN_BUDGET = {
+    "gpt-5": 240000,
+    "gpt-4.1": 18000,
+}
+DEFAULT_HISTORY_TOKEN_BUDGET = 18000
+HISTORY_OMITTED_NOTE = "[{count} earlier follow-up messages omitted to stay within the token budget]"
 
 
 class LLMHandler:
@@ -34,9 +428,13 @@ class LLMHandler:
     Attributes:
         client (OpenAI): Authenticated OpenAI client instance
         model (str): Currently active model name (gpt-4.1, gpt-5, etc.)
-        total_input_tokens (int): Cumulative input tokens across all requests
-        total_output_tokens (int): Cumulative output tokens across all requests
+        total_input_tokens (int): Cumulative input tokens of synchronous requests
+        total_output_tokens (int): Cumulative output tokens of synchronous requests
+        batch_input_tokens (int): Input tokens of Batch API requests (billed at a discount)
+        batch_output_tokens (int): Output tokens of Batch API requests (billed at a discount)
         api_calls (int): Total number of API calls made
+        cache_hits (int): Requests answered from the on-disk response cache
+        cache_misses (int): Requests that had to be sent to the API
         
     Example:
         >>> handler = LLMHandler(api_key="your-key", model="gpt-4.1")
@@ -45,7 +443,7 @@ class LLMHandler:
         >>> print(f"Cost: ${stats['cost']['total_cost']:.4f}")
     """
     
-    def __init__(self, api_key: str, model: str = "gpt-4.1"):
+    def __init__(self, api_key: str, model: str = "gpt-4.1", client: Optional["OpenAI"] = None):
         """
         Initialize the LLM handler with authentication and model configuration.
         
@@ -53,6 +451,8 @@ class LLMHandler:
             api_key (str): Valid OpenAI API key for authentication
             model (str): OpenAI model to use (default: "gpt-4.1")
                         Supported: "gpt-4.1", "gpt-5", "gpt-4-turbo"
+            client (Optional[OpenAI]): Existing client to reuse, e.g. one shared
+                        across sessions; created from api_key when omitted
         
         Raises:
             AuthenticationError: If the API key is invalid
@@ -62,46 +462,159 @@ class LLMHandler:
             - Initializes with zero token counters for fresh tracking
             - Validates API key during client initialization
             - Sets up optimized parameters for IPE log analysis
+            - Token counters always belong to this handler, even when the
+              client is shared
         """
-        self.client = OpenAI(api_key=api_key)
+        if client is None:
+            # Imported here so the openai package is only loaded once a handler is needed
+            from openai import OpenAI
+            client = OpenAI(api_key=api_key)
+        
+        self.client = client
         self.model = model
         self.total_input_tokens = 0
         self.total_output_tokens = 0
+        self.batch_input_tokens = 0
+        self.batch_output_tokens = 0
         self.api_calls = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
         self.processing_method = "Direct"  # Default processing method
+        # Chunks may be summarized concurrently; guard the usage counters
+        self._usage_lock = threading.Lock()
+        # Batch API jobs whose usage is already in the totals
+        self._counted_batches: Set[str] = set()
+        # Client-side pacing shared by every request this handler makes
+        tokens_per_minute, requests_per_minute = RATE_LIMITS.get(model, DEFAULT_RATE_LIMITS)
+        self._tpm_limiter = TokenBucket(tokens_per_minute)
+        self._rpm_limiter = TokenBucket(requests_per_minute)
+        # Requests in flight; halved on rate limit errors, regrown on success
+        self.concurrency = AdaptiveConcurrencyLimit(MAX_CONCURRENT_REQUESTS)
+        # Measured call latencies drive the chunk size of later analyses
+        self.chunk_sizer = get_chunk_sizer(model)
+    
+    def _record_usage(self, response):
+        """
+        Add the token usage of a completed API call to the running totals.
+        
+        Args:
+            response: ChatCompletion response object with usage information
+        """
+        with self._usage_lock:
+            self.total_input_tokens += response.usage.prompt_tokens
+            self.total_output_tokens += response.usage.completion_tokens
+            self.api_calls += 1
+    
+    def _complete(self, messages: List[Dict[str, str]]) -> str:
+        """
+        Return the reply to a chat completion, using the response cache.
+        
+        Identical requests (same model and messages) are answered from disk
+        without an API call; otherwise the request is sent, its usage is
+        recorded and the reply is cached.
+        
+        Args:
+            messages: List of message dictionaries for the chat completion
+            
+        Returns:
+            str: The model's reply
+        """
+        key = response_cache_key(self.model, messages)
+        reply = load_cached_reply(key)
+        if reply is not None:
+            with self._usage_lock:
+                self.cache_hits += 1
+            return reply
+        
+        response = self._api_call_with_retry(messages)
+        
+        # Track usage statistics
+        self._record_usage(response)
+        with self._usage_lock:
+            self.cache_misses += 1
+        
+        reply = response.choices[0].message.content
+        if reply:
+            store_cached_reply(key, reply)
+        return reply
     
-    def _api_call_with_retry(self, messages: List[Dict[str, str]], max_retries: int = 5):
+    def _request_params(self, messages: List[Dict[str, str]], stream: bool = False) -> Dict[str, Any]:
+        """
+        Build the chat completion parameters for the active model.
+        
+        Args:
+            messages: List of message dictionaries for the chat completion
+            stream: Request a streamed response with a final usage chunk
+            
+        Returns:
+            Dict[str, Any]: Keyword arguments for chat.completions.create()
+        """
+        # GPT-5 only supports temperature=1 (default), other models support 0.3
+        api_params = {
+            "model": self.model,
+            "messages": messages
+        }
+        
+        # Only set temperature for non-GPT-5 models
+        if self.model != "gpt-5":
+            api_params["temperature"] = 0.3
+        
+        if stream:
+            api_params["stream"] = True
+            api_params["stream_options"] = {"include_usage": True}
+        
+        return api_params
+    
+    def _api_call_with_retry(self, messages: List[Dict[str, str]], max_retries: int = 5, stream: bool = False):
         """
         Make an API call with exponential backoff retry logic for rate limits.
         
         Args:
             messages: List of message dictionaries for the chat completion
             max_retries: Maximum number of retry attempts (default: 5)
+            stream: Return a stream of completion chunks instead of a response
             
         Returns:
-            ChatCompletion response object
+            ChatCompletion response object, or a Stream of ChatCompletionChunk
+            objects when stream is True
             
         Raises:
             Exception: If all retries are exhausted
+            
+        Note:
+            - Every attempt first waits on the TPM/RPM limiters for the
+              prompt's token count, so concurrent callers stay within budget
+            - Attempts also hold a slot of self.concurrency; rate limit errors
+              shrink it, successful calls grow it back
+            - The latency of successful calls is recorded in self.chunk_sizer
+              (except streams, which return before the reply is generated)
         """
+        # The leading system prompt repeats on every call, so its count is
+        # memoized; later system messages (evidence, history notes) and the rest
+        # of the prompt are new per request and would only evict it
+        prompt_tokens = sum(
+            count_prompt_tokens(message["content"], self.model) if index == 0 and message["role"] == "system"
+            else count_tokens(message["content"], self.model, use_cache=False)
+            for index, message in enumerate(messages)
+        )
+        
         for attempt in range(max_retries):
+            self._tpm_limiter.acquire(prompt_tokens)
+            self._rpm_limiter.acquire()
+            self.concurrency.acquire()
             try:
-                # GPT-5 only supports temperature=1 (default), other models support 0.3
-                api_params = {
-                    "model": self.model,
-                    "messages": messages
-                }
-                
-                # Only set temperature for non-GPT-5 models
-                if self.model != "gpt-5":
-                    api_params["temperature"] = 0.3
-                
-                response = self.client.chat.completions.create(**api_params)
+                started = time.monotonic()
+                response = self.client.chat.completions.create(**self._request_params(messages, stream))
+                if not stream:
+                    self.chunk_sizer.record(prompt_tokens, time.monotonic() - started)
+                self.concurrency.release()
                 return response
             except Exception as e:
                 error_message = str(e)
+                rate_limited = "rate_limit_exceeded" in error_message or "429" in error_message
+                self.concurrency.release(rate_limited)
                 # Check if it's a rate limit error
-                if "rate_limit_exceeded" in error_message or "429" in error_message:
+                if rate_limited:
                     if attempt < max_retries - 1:
                         # Extract wait time from error message if available
                         wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s, 4s, 8s, 16s
@@ -109,11 +622,10 @@ class LLMHandler:
                         # Try to parse the recommended wait time from error message
                         if "Please try again in" in error_message:
                             try:
-                                import re
-                                match = re.search(r'try again in ([\d.]+)s', error_message)
+                                match = RETRY_AFTER_RE.search(error_message)
                                 if match:
                                     wait_time = float(match.group(1)) + 1  # Add 1 second buffer
-                            except:
+                            except ValueError:
                                 pass
                         
                         print(f"Rate limit hit. Waiting {wait_time:.1f}s before retry {attempt + 1}/{max_retries}...")
@@ -160,14 +672,7 @@ class LLMHandler:
             {"role": "user", "content": content}
         ]
         
-        response = self._api_call_with_retry(messages)
-        
-        # Track usage statistics
-        self.total_input_tokens += response.usage.prompt_tokens
-        self.total_output_tokens += response.usage.completion_tokens
-        self.api_calls += 1
-        
-        return response.choices[0].message.content
+        return self._complete(messages)
     
     def summarize_chunk(
         self, 
@@ -211,9 +716,29 @@ class LLMHandler:
         Note:
             - Used in Basic processing tier (150K-500K tokens)
             - Optimized for chunk-by-chunk analysis
-            - Enables parallel processing of large log files
+            - Safe to call from several threads at once (usage tracking is locked)
             - Essential for memory-efficient processing
         """
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": self._chunk_prompt(chunk, chunk_index, total_chunks)}
+        ]
+        
+        return self._complete(messages)
+    
+    @staticmethod
+    def _chunk_prompt(chunk: str, chunk_index: Optional[int], total_chunks: Optional[int]) -> str:
+        """
+        Build the user prompt for summarizing a single chunk.
+        
+        Args:
+            chunk (str): Individual log chunk to summarize
+            chunk_index (int, optional): Current chunk number (1-indexed)
+            total_chunks (int, optional): Total number of chunks being processed
+            
+        Returns:
+            str: Prompt with chunk position context, or the bare chunk
+        """
         if chunk_index and total_chunks:
             # Enhanced prompt with chunk context
             chunk_prompt = f"""
@@ -236,19 +761,278 @@ Log content:
             # Standard processing without chunk context
             chunk_prompt = chunk
         
+        return chunk_prompt
+    
+    def plan_chunk_batches(self, chunks: List[str], batch_size: int = 4) -> List[List[int]]:
+        """
+        Group consecutive chunks into batches for batch_summarize_chunks().
+        
+        Chunks are added to the current batch until either batch_size chunks
+        are collected or the next chunk would push the batch past the model's
+        token budget (BATCH_TOKEN_BUDGET).
+        
+        Args:
+            chunks (List[str]): Log chunks in their original order
+            batch_size (int): Maximum number of chunks per batch (default: 4)
+            
+        Returns:
+            List[List[int]]: Chunk indices for each batch, in order
+            
+        Example:
+            >>> handler.plan_chunk_batches(["a" * 100, "b" * 100, "c" * 100], batch_size=2)
+            [[0, 1], [2]]
+            
+        Note:
+            - A chunk larger than the budget always gets a batch of its own
+            - Token counts reuse count_tokens() and its cache
+        """
+        token_budget = BATCH_TOKEN_BUDGET.get(self.model, DEFAULT_BATCH_TOKEN_BUDGET)
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        
+        for i, chunk in enumerate(chunks):
+            chunk_tokens = count_tokens(chunk, self.model)
+            if current and (len(current) >= batch_size or current_tokens + chunk_tokens > token_budget):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += chunk_tokens
+        
+        if current:
+            batches.append(current)
+        
+        return batches
+    
+    def batch_summarize_chunks(
+        self, 
+        chunks: List[str], 
+        system_prompt: str, 
+        first_chunk_index: Optional[int] = None, 
+        total_chunks: Optional[int] = None
+    ) -> List[str]:
+        """
+        Summarize several log chunks with a single API call.
+        
+        The chunks are sent as delimited segments and the model is asked to
+        return a JSON array with one summary per segment. This collapses N
+        chunk requests into one, saving the per-request overhead and the
+        repeated system prompt.
+        
+        Args:
+            chunks (List[str]): Log chunks to summarize together
+            system_prompt (str): System instructions for analysis
+            first_chunk_index (int, optional): Position of chunks[0] in the whole file (1-indexed)
+            total_chunks (int, optional): Total number of chunks being processed
+            
+        Returns:
+            List[str]: One summary per chunk, in the same order as chunks
+            
+        Example:
+            >>> summaries = handler.batch_summarize_chunks(
+            ...     [chunk1, chunk2, chunk3], 
+            ...     system_prompt, 
+            ...     first_chunk_index=1, 
+            ...     total_chunks=6
+            ... )
+            >>> len(summaries)
+            3
+            
+        Note:
+            - A single chunk is passed straight to summarize_chunk()
+            - If the response is not a valid JSON array with one summary per
+              segment, each chunk is summarized individually instead
+            - Use plan_chunk_batches() to keep batches within the token budget
+        """
+        def chunk_number(offset: int) -> Optional[int]:
+            return first_chunk_index + offset if first_chunk_index else None
+        
+        if len(chunks) == 1:
+            return [self.summarize_chunk(chunks[0], system_prompt, chunk_number(0), total_chunks)]
+        
+        position = ""
+        if first_chunk_index and total_chunks:
+            position = (
+                f" They are chunks {first_chunk_index}-{first_chunk_index + len(chunks) - 1} "
+                f"of {total_chunks} from IPEmotionRT log files."
+            )
+        segments = "\n".join(
+            f"{SEGMENT_MARKER.format(index=i)}\n{chunk}" for i, chunk in enumerate(chunks)
+        )
+        batch_prompt = f"""
+Summarize each of the following {len(chunks)} log segments independently.{position}
+
+For every segment extract ONLY the key information:
+- Software/Hardware info (if present)
+- Measurement IDs and start times  
+- Errors and warnings with timestamps
+- System events (startup, shutdown, etc.)
+- Network connectivity changes
+- Protocol timeouts or failures
+
+Be concise but precise. Use bullet points for easy consolidation.
+
+Return ONLY a JSON array, one object per segment, in this form:
+[{{"idx": 0, "summary": "..."}}, {{"idx": 1, "summary": "..."}}]
+
+{segments}
+"""
+        
         messages = [
             {"role": "system", "content": system_prompt},
-            {"role": "user", "content": chunk_prompt}
+            {"role": "user", "content": batch_prompt}
         ]
         
-        response = self._api_call_with_retry(messages)
+        summaries = self._parse_batch_summaries(self._complete(messages), len(chunks))
+        if summaries is None:
+            # Malformed batch response - fall back to one request per chunk
+            return [
+                self.summarize_chunk(chunk, system_prompt, chunk_number(i), total_chunks)
+                for i, chunk in enumerate(chunks)
+            ]
         
-        # Track usage statistics
-        self.total_input_tokens += response.usage.prompt_tokens
-        self.total_output_tokens += response.usage.completion_tokens
-        self.api_calls += 1
+        return summaries
+    
+    @staticmethod
+    def _parse_batch_summaries(reply: str, expected: int) -> Optional[List[str]]:
+        """
+        Parse the JSON array returned for a batched summarization request.
+        
+        Args:
+            reply (str): Raw model response
+            expected (int): Number of segments that were sent
+            
+        Returns:
+            Optional[List[str]]: Summaries ordered by segment index, or None if
+                                 the reply is not usable
+        """
+        # Models sometimes wrap the JSON in a markdown code fence
+        start, end = reply.find("["), reply.rfind("]")
+        if start == -1 or end <= start:
+            return None
         
-        return response.choices[0].message.content
+        try:
+            items = json.loads(reply[start:end + 1])
+        except ValueError:
+            return None
+        
+        if not isinstance(items, list):
+            return None
+        
+        summaries: List[Optional[str]] = [None] * expected
+        for item in items:
+            if not isinstance(item, dict):
+                return None
+            idx, summary = item.get("idx"), item.get("summary")
+            if not isinstance(idx, int) or not 0 <= idx < expected or not isinstance(summary, str):
+                return None
+            summaries[idx] = summary
+        
+        if any(summary is None for summary in summaries):
+            return None
+        
+        return summaries
+    
+    def submit_batch(self, chunks: List[str], system_prompt: str) -> str:
+        """
+        Submit chunk summarization requests to the OpenAI Batch API.
+        
+        Every chunk becomes one /v1/chat/completions request in a JSONL file,
+        which is uploaded and queued as a batch. Batch requests are billed at
+        half the synchronous price but complete asynchronously (within 24h).
+        
+        Args:
+            chunks (List[str]): Log chunks to summarize
+            system_prompt (str): System instructions for analysis
+            
+        Returns:
+            str: Batch ID to poll with retrieve_batch()
+            
+        Example:
+            >>> batch_id = handler.submit_batch(chunks, system_prompt)
+            >>> status, summaries = handler.retrieve_batch(batch_id)
+            >>> status
+            'in_progress'
+            
+        Note:
+            - Uses the same prompts as summarize_chunk()
+            - No tokens are tracked until the results are retrieved
+        """
+        requests = []
+        for i, chunk in enumerate(chunks):
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": self._chunk_prompt(chunk, i + 1, len(chunks))}
+            ]
+            requests.append(json.dumps({
+                "custom_id": f"chunk-{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._request_params(messages)
+            }))
+        
+        batch_file = self.client.files.create(
+            file=("chunk_summaries.jsonl", "\n".join(requests).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        
+        return batch.id
+    
+    def retrieve_batch(self, batch_id: str) -> Tuple[str, Optional[List[str]]]:
+        """
+        Check a submitted batch and collect its chunk summaries once complete.
+        
+        Args:
+            batch_id (str): ID returned by submit_batch()
+            
+        Returns:
+            Tuple[str, Optional[List[str]]]: Batch status and, when the status
+                is "completed", the summaries in chunk order (None otherwise)
+                
+        Note:
+            - Token usage of the completed requests is added to the batch
+              counters (priced at BATCH_PRICE_FACTOR) the first time the batch
+              is retrieved as completed
+            - Requests that failed inside the batch are left out of the summaries
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status != "completed":
+            return batch.status, None
+        
+        results: Dict[int, str] = {}
+        input_tokens = output_tokens = completed_requests = 0
+        if batch.output_file_id:
+            output = self.client.files.content(batch.output_file_id).text
+            for line in output.splitlines():
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                response = result.get("response") or {}
+                if response.get("status_code") != 200:
+                    continue
+                body = response["body"]
+                usage = body.get("usage", {})
+                input_tokens += usage.get("prompt_tokens", 0)
+                output_tokens += usage.get("completion_tokens", 0)
+                completed_requests += 1
+                index = int(result["custom_id"].rsplit("-", 1)[1])
+                results[index] = body["choices"][0]["message"]["content"]
+        
+        # Count each batch once, even when it is retrieved again (e.g. after
+        # combining its summaries failed and the user checks the status again)
+        with self._usage_lock:
+            if batch_id not in self._counted_batches:
+                self._counted_batches.add(batch_id)
+                self.batch_input_tokens += input_tokens
+                self.batch_output_tokens += output_tokens
+                self.api_calls += completed_requests
+        
+        return batch.status, [results[i] for i in sorted(results)]
     
     def combine_summaries(self, summaries: List[str], system_prompt: str) -> str:
         """
@@ -307,14 +1091,7 @@ Chunk summaries to consolidate:
             {"role": "user", "content": combined_prompt}
         ]
         
-        response = self._api_call_with_retry(messages)
-        
-        # Track usage statistics
-        self.total_input_tokens += response.usage.prompt_tokens
-        self.total_output_tokens += response.usage.completion_tokens
-        self.api_calls += 1
-        
-        return response.choices[0].message.content
+        return self._complete(messages)
     
     def answer_question(self, messages: List[Dict[str, str]]) -> str:
         """
@@ -352,6 +1129,115 @@ Chunk summaries to consolidate:
             - Leverages previously analyzed log data for context
             - Optimized for technical accuracy and relevance
             - Essential for detailed troubleshooting workflows
+            - Long conversations are pruned to HISTORY_TOKEN_BUDGET, see _prune_history()
+        """
+        return self._complete(self._with_evidence(self._prune_history(messages)))
+    
+    def stream_answer(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """
+        Answer a follow-up question, yielding the reply as it is generated.
+        
+        Same prompt, history pruning, evidence injection and response cache as answer_question(),
+        but the completion is streamed so the first words can be shown after
+        well under a second instead of after the whole reply.
+        
+        Args:
+            messages (List[Dict[str, str]]): Complete conversation history
+            
+        Returns:
+            Iterator[str]: Text deltas of the reply, in order
+            
+        Example:
+            >>> reply = "".join(handler.stream_answer(messages))
+            >>> reply == handler.answer_question(messages)    # served from the response cache
+            True
+            
+        Note:
+            - Designed for st.write_stream(), which renders the deltas and
+              returns the joined reply
+            - A cached reply is yielded in one piece
+            - Token usage arrives with the last stream chunk and is recorded
+              once the stream is exhausted
+        """
+        injected_messages = self._with_evidence(self._prune_history(messages))
+        key = response_cache_key(self.model, injected_messages)
+        reply = load_cached_reply(key)
+        if reply is not None:
+            with self._usage_lock:
+                self.cache_hits += 1
+            yield reply
+            return
+        
+        parts = []
+        for chunk in self._api_call_with_retry(injected_messages, stream=True):
+            if chunk.usage is not None:
+                # Track usage statistics (sent with the final chunk)
+                self._record_usage(chunk)
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+        
+        with self._usage_lock:
+            self.cache_misses += 1
+        reply = "".join(parts)
+        if reply:
+            store_cached_reply(key, reply)
+    
+    def _prune_history(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Leave out the oldest follow-up turns once the conversation exceeds its token budget.
+        
+        The messages before the first user question (system prompt and log
+        analysis) and the latest question are always kept. Older turns are
+        dropped from the front, question and answer together, and replaced by
+        one note so the model knows part of the conversation is missing.
+        
+        Args:
+            messages (List[Dict[str, str]]): Complete conversation history
+            
+        Returns:
+            List[Dict[str, str]]: The messages unchanged when within
+                                  HISTORY_TOKEN_BUDGET, otherwise the pruned copy
+            
+        Note:
+            - Truncation instead of summarizing old turns: it costs no extra
+              request, and the same history always prunes to the same messages,
+              so repeated questions still hit the response cache
+            - Keeps the input tokens of each follow-up roughly flat instead of
+              growing with every turn
+        """
+        budget = HISTORY_TOKEN_BUDGET.get(self.model, DEFAULT_HISTORY_TOKEN_BUDGET)
+        counts = [count_tokens(m['content'], self.model) for m in messages]
+        total = sum(counts)
+        if total <= budget:
+            return messages
+        
+        first_question = next((i for i, m in enumerate(messages) if m['role'] == 'user'), len(messages))
+        start = first_question
+        last = len(messages) - 1
+        while total > budget and start < last:
+            # Drop the oldest question together with the answer that follows it
+            total -= counts[start]
+            start += 1
+            if start < last and messages[start]['role'] == 'assistant':
+                total -= counts[start]
+                start += 1
+        
+        if start == first_question:
+            return messages
+        note = {"role": "system", "content": HISTORY_OMITTED_NOTE.format(count=start - first_question)}
+        return messages[:first_question] + [note] + messages[start:]
+    
+    def _with_evidence(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Add raw log lines supporting the last user question to the conversation.
+        
+        Args:
+            messages (List[Dict[str, str]]): Complete conversation history
+            
+        Returns:
+            List[Dict[str, str]]: The messages, plus an evidence system message
+                                  when the question concerns CPU usage
         """
         # Inject relevant raw log snippets (evidence) for improved grounded answers
         # We look for CPU usage context if the user asks about CPU
@@ -360,13 +1246,9 @@ Chunk summaries to consolidate:
         if 'cpu' in user_last.lower():
             try:
                 import streamlit as st
-                raw_content = st.session_state.get('final_processed_content') or st.session_state.get('raw_log_content') or ''
-                evidence_lines = []
-                for line in raw_content.split('\n'):
-                    if 'CPU:' in line:
-                        evidence_lines.append(line.strip())
-                    if len(evidence_lines) >= 40:  # cap evidence to avoid token blow-up
-                        break
+                log_path = st.session_state.get('final_processed_path') or st.session_state.get('raw_log_path')
+                # cap evidence to avoid token blow-up
+                evidence_lines = find_lines_in_file(log_path, 'CPU:', 40) if log_path else []
                 if evidence_lines:
                     evidence_block = "\n".join(evidence_lines)
                     injected_messages.append({
@@ -379,14 +1261,7 @@ Chunk summaries to consolidate:
             except Exception:
                 pass
 
-        response = self._api_call_with_retry(injected_messages)
-        
-        # Track usage statistics
-        self.total_input_tokens += response.usage.prompt_tokens
-        self.total_output_tokens += response.usage.completion_tokens
-        self.api_calls += 1
-        
-        return response.choices[0].message.content
+        return injected_messages
     
     def set_processing_method(self, method: str):
         """
@@ -412,6 +1287,8 @@ Chunk summaries to consolidate:
                 - input_tokens (int): Total input tokens across all requests
                 - output_tokens (int): Total output tokens generated
                 - total_tokens (int): Combined input and output tokens
+                - cache_hits (int): Requests answered from the response cache
+                - cache_misses (int): Requests sent to the API
                 - cost (Dict): Detailed cost breakdown with:
                     - input_cost (float): Cost for input tokens (USD)
                     - output_cost (float): Cost for output tokens (USD)
@@ -440,18 +1317,21 @@ Chunk summaries to consolidate:
             - Critical for budget management and optimization
             - Used for performance monitoring and reporting
         """
-        from log_processor import calculate_costs
         
         cost_info = calculate_costs(
             self.total_input_tokens,
             self.total_output_tokens,
             self.model,
-            self.processing_method
+            self.processing_method,
+            batch_input_tokens=self.batch_input_tokens,
+            batch_output_tokens=self.batch_output_tokens
         )
         return {
             'api_calls': self.api_calls,
-            'input_tokens': self.total_input_tokens,
-            'output_tokens': self.total_output_tokens,
-            'total_tokens': self.total_input_tokens + self.total_output_tokens,
+            'input_tokens': cost_info['input_tokens'],
+            'output_tokens': cost_info['output_tokens'],
+            'total_tokens': cost_info['input_tokens'] + cost_info['output_tokens'],
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
             'cost': cost_info
         }
@@ -49,18 +49,52 @@ License: Internal Use - IPETRONIK IPE Log Analysis
 """
 
 import streamlit as st
+import io
 import os
-import zipfile
-from typing import List, Tuple, Dict, Any, Optional
+import re
+import hashlib
+import json
+import shutil
+import tempfile
+import time
+import weakref
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import accumulate, chain, repeat
+from typing import TYPE_CHECKING, List, Tuple, Dict, Any, Iterable, Iterator, Optional, TextIO
 
 # Import our custom modules
+# Note: zipfile and llm_handler (openai) are imported where first used so that
+# rendering the page without an upload does not pay their import cost
 from log_processor import (
     count_tokens,
+    count_prompt_tokens,
+    estimate_tokens_fast,
     chunk_text_by_tokens,
+    count_line_tokens,
     filter_log_content,
-    extract_key_metrics
+    collapse_repeated_lines,
+    write_file_atomic,
+    prune_cache_entries,
+    extract_key_metrics,
+    iter_lines,
+    LineTokenCounter,
+    preprocess_lines,
+    classify_turbo_block,
+    split_file_ranges,
+    preprocess_file_range,
+    turbo_filter_range,
+    PREPROCESS_PRESERVE_LAST_LINES,
+    TURBO_PRESERVE_LAST_LINES,
+    TURBO_BLOCK_LINES,
+    TURBO_CRITICAL_IDS,
+    TURBO_LESS_CRITICAL_IDS
 )
-from llm_handler import LLMHandler
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+    from llm_handler import LLMHandler
 
 
 # ===============================
@@ -130,6 +164,31 @@ Notes:
 TOKEN_THRESHOLD_FILTERING = 150000      # Switch to Basic processing (with filtering)
 TOKEN_THRESHOLD_TURBO_FILTERING = 500000  # Switch to Turbo processing (aggressive filtering)
 MAX_TOKENS_PER_CHUNK = 20000           # Safe chunk size within rate limits (30K TPM limit)
+CHUNK_PROMPT_OVERHEAD_TOKENS = 200     # Chunk position and extraction instructions added to each chunk prompt
+# Exact token counting is only needed when the fast estimate lands near a tier boundary
+ESTIMATE_MARGIN_FILTERING = 15000      # Margin around TOKEN_THRESHOLD_FILTERING
+ESTIMATE_MARGIN_TURBO_FILTERING = 50000  # Margin around TOKEN_THRESHOLD_TURBO_FILTERING
+CHUNK_ESTIMATE_SAFE_FRACTION = 0.7     # Estimates below this share of MAX_TOKENS_PER_CHUNK skip exact counting
+HASH_SLICE_CHARS = 1 << 20             # Characters encoded per sha256 update when hashing log content
+WRITE_SLICE_CHARS = 1 << 20            # Characters encoded per write when spilling text to disk
+PARALLEL_FILTER_MIN_BYTES = 1 << 26     # Raw logs at least this large are turbo filtered on several processes
+PARALLEL_FILTER_WORKERS = os.cpu_count() or 1  # Worker processes for parallel turbo filtering
+ZIP_EXTRACT_WORKERS = os.cpu_count() or 1      # Threads decompressing the members of a ZIP archive
+SESSION_FILE_PREFIX = "ipe_log_"       # Temp directories holding a session's spilled log files
+SESSION_FILE_MAX_AGE_SECONDS = 86400   # Spilled files untouched this long are swept at startup
+
+# Filtering results are cached on disk by content digest, so analyzing the same
+# logs again (another model, a rerun, a restarted app) skips the filtering pass
+PIPELINE_VERSION = 1                   # Bump whenever filtering output changes; older cache entries are ignored
+FILTER_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "loganalyzer")
+FILTER_CACHE_MAX_ENTRIES = 16          # Least recently used results beyond this are removed
+
+# Leading "DD.MM.YYYY HH:MM:SS(.micro)" timestamp of events listed in the metrics summary
+EVENT_TIMESTAMP_RE = re.compile(r'(\d{2}\.\d{2}\.\d{4}\s+\d{2}:\d{2}:\d{2}(?:\.\d{3,6})?)')
+
+# File boundary marker written before each log file when combining
+_BOUNDARY_PRE = "====== FILE: "
+_BOUNDARY_POST = " ======\n"
 
 # Processing Tier Configuration:
 # Tier 1 - Direct: < 150K tokens (single API call, no filtering)
@@ -174,18 +233,28 @@ def extract_logs_from_zip(zip_file) -> List[Tuple[str, str]]:
         - Only processes files with .LOG extension (case-insensitive)
         - Skips directories and non-log files automatically
         - Uses UTF-8 decoding with error tolerance for robust processing
+        - Members are decompressed on up to ZIP_EXTRACT_WORKERS threads
         - Provides user-friendly error messages via Streamlit interface
     """
+    import zipfile
+    
     log_files = []
     try:
         with zipfile.ZipFile(zip_file) as z:
-            for file_info in z.infolist():
-                if file_info.filename.upper().endswith(".LOG") and not file_info.is_dir():
-                    with z.open(file_info) as f:
-                        # Decode with error tolerance for various text encodings
-                        text = f.read().decode("utf-8", errors="ignore")
-                        display_name = os.path.basename(file_info.filename)
-                        log_files.append((display_name, text))
+            # Compare only the 4-character suffix instead of uppercasing the full path
+            members = [
+                file_info for file_info in z.infolist()
+                if len(file_info.filename) >= 4 and file_info.filename[-4:].lower() == ".log"
+                and not file_info.is_dir()
+            ]
+            # Inflate members on worker threads: zlib releases the GIL, so the logs
+            # of a large archive decompress in parallel. Results keep archive order
+            # and errors are re-raised here, on the Streamlit script thread.
+            with ThreadPoolExecutor(max_workers=max(1, min(len(members), ZIP_EXTRACT_WORKERS))) as executor:
+                texts = executor.map(lambda file_info: _read_zip_member(z, file_info), members)
+                for file_info, text in zip(members, texts):
+                    display_name = os.path.basename(file_info.filename)
+                    log_files.append((display_name, text))
     except zipfile.BadZipFile:
         st.error(f"❌ Error: {zip_file.name} is not a valid ZIP file.")
     except Exception as e:
@@ -194,6 +263,50 @@ def extract_logs_from_zip(zip_file) -> List[Tuple[str, str]]:
     return log_files
 
 
+def _read_zip_member(z, file_info) -> str:
+    """
+    Decompress and decode one member of an open ZIP archive.
+    
+    Safe to call from several threads on the same archive: zipfile serializes
+    reads of the underlying file, while decompression runs in parallel.
+    
+    Args:
+        z: Open zipfile.ZipFile
+        file_info: ZipInfo of the member to read
+        
+    Returns:
+        Decoded text content of the member
+    """
+    with z.open(file_info) as f:
+        # Read with the known uncompressed size so the buffer is sized once;
+        # decode with error tolerance for various text encodings
+        return f.read(file_info.file_size).decode("utf-8", errors="ignore")
+
+
+def _content_digest(content: str) -> bytes:
+    """
+    Compute a compact digest of log content for duplicate detection.
+    
+    The content is encoded and hashed in fixed-size slices so large logs are
+    never re-encoded into a single full-size bytes copy.
+    
+    Args:
+        content: Decoded log file content
+        
+    Returns:
+        16-byte digest identifying the content
+        
+    Note:
+        - sha256 truncated to 16 bytes rather than blake2b: OpenSSL's sha256
+          uses the SHA extensions of current x86-64 and ARMv8 CPUs and hashed
+          126M characters of log text in 0.11s against 0.21s for blake2b
+    """
+    digest = hashlib.sha256()
+    for start in range(0, len(content), HASH_SLICE_CHARS):
+        digest.update(content[start:start + HASH_SLICE_CHARS].encode("utf-8", errors="ignore"))
+    return digest.digest()[:16]
+
+
 def process_uploaded_files(uploaded_files) -> List[Tuple[str, str]]:
     """
     Process mixed file uploads (.LOG files and .ZIP archives) into unified log content.
@@ -217,7 +330,8 @@ def process_uploaded_files(uploaded_files) -> List[Tuple[str, str]]:
         3. For .LOG files: Direct text extraction with encoding handling
         4. For .ZIP files: Extract all contained .LOG files
         5. Aggregate all log content into unified list
-        6. Provide detailed feedback on processing results
+        6. Drop exact duplicate files (same content hash)
+        7. Provide detailed feedback on processing results
         
     Example:
         >>> files = st.file_uploader("Upload files", type=["log", "zip"], accept_multiple_files=True)
@@ -233,6 +347,8 @@ def process_uploaded_files(uploaded_files) -> List[Tuple[str, str]]:
         
     Note:
         - Supports case-insensitive file extension matching
+        - Duplicate logs (e.g. the same file in several ZIP archives) are only
+          analyzed once, avoiding redundant token usage
         - Maintains original filename context for user reference
         - Provides comprehensive feedback via Streamlit UI
         - Optimized for batch processing of multiple log sources
@@ -240,17 +356,19 @@ def process_uploaded_files(uploaded_files) -> List[Tuple[str, str]]:
     all_log_files = []
     
     for uploaded_file in uploaded_files:
-        file_extension = uploaded_file.name.upper().split('.')[-1]
+        file_extension = os.path.splitext(uploaded_file.name)[1].lower()  # '.log' or '.zip'
         
-        if file_extension == 'LOG':
+        if file_extension == '.log':
             try:
-                # Extract individual .LOG file content
-                file_text = uploaded_file.read().decode("utf-8", errors="ignore")
+                # Decode straight from the upload's in-memory buffer; read() would
+                # first copy the whole file into a second bytes object
+                with uploaded_file.getbuffer() as file_bytes:
+                    file_text = str(file_bytes, "utf-8", "ignore")
                 all_log_files.append((uploaded_file.name, file_text))
             except Exception as e:
                 st.error(f"❌ Error reading LOG file {uploaded_file.name}: {str(e)}")
                 
-        elif file_extension == 'ZIP':
+        elif file_extension == '.zip':
             # Extract all .LOG files from ZIP archive
             log_files_from_zip = extract_logs_from_zip(uploaded_file)
             if log_files_from_zip:
@@ -260,7 +378,18 @@ def process_uploaded_files(uploaded_files) -> List[Tuple[str, str]]:
         else:
             st.warning(f"⚠️ Unsupported file type: {uploaded_file.name}")
     
-    return all_log_files
+    # Drop exact duplicates so identical logs are not billed twice
+    seen_digests = set()
+    unique_log_files = []
+    for filename, content in all_log_files:
+        digest = _content_digest(content)
+        if digest in seen_digests:
+            st.info(f"ℹ️ Skipping duplicate log file: {filename}")
+            continue
+        seen_digests.add(digest)
+        unique_log_files.append((filename, content))
+    
+    return unique_log_files
 
 
 def combine_log_files(log_files: List[Tuple[str, str]]) -> str:
@@ -315,28 +444,267 @@ def combine_log_files(log_files: List[Tuple[str, str]]) -> str:
     if len(log_files) == 1:
         # Single file - return content directly with simple header
         filename, content = log_files[0]
-        return f"====== FILE: {filename} ======\n{content}"
-    
-    # Multiple files - combine with clear boundaries
-    combined_content = []
-    for filename, content in log_files:
-        combined_content.append(f"====== FILE: {filename} ======")
-        combined_content.append(content)
-        combined_content.append("")  # Empty line for separation
-    
-    return "\n".join(combined_content)
+        return _BOUNDARY_PRE + filename + _BOUNDARY_POST + content
+    
+    # Multiple files - write pieces straight into one buffer with clear boundaries
+    buffer = io.StringIO()
+    write = buffer.write
+    for index, (filename, content) in enumerate(log_files):
+        if index:
+            write("\n")  # Empty line for separation
+        write(_BOUNDARY_PRE)
+        write(filename)
+        write(_BOUNDARY_POST)
+        write(content)
+        write("\n")
+    
+    return buffer.getvalue()
 
 
 # ===============================
 # Core Processing Logic
 # ===============================
 
+class SessionFiles:
+    """
+    Temporary directory holding the spilled log files of one Streamlit session.
+    
+    The instance is kept in st.session_state only. When Streamlit discards the
+    session (tab closed, session timeout) the instance is garbage collected
+    and weakref.finalize removes the directory; finalizers also run at
+    interpreter exit, so a regular server shutdown cleans up as well.
+    
+    Attributes:
+        path (str): Directory for the session's files
+    """
+    
+    def __init__(self):
+        self.path = tempfile.mkdtemp(prefix=SESSION_FILE_PREFIX)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, ignore_errors=True)
+
+
+def _session_files_dir() -> str:
+    """Directory of the current session's SessionFiles, created on first use."""
+    holder = st.session_state.get('_session_files')
+    if holder is None or not os.path.isdir(holder.path):
+        holder = SessionFiles()
+        st.session_state['_session_files'] = holder
+    return holder.path
+
+
+@st.cache_resource(show_spinner=False)
+def sweep_stale_session_files() -> int:
+    """
+    Remove spilled log files left behind by earlier server processes.
+    
+    Runs once per process. Files of sessions that ended with a killed or
+    crashed server never see their finalizer; anything under the temp
+    directory named SESSION_FILE_PREFIX* and untouched for
+    SESSION_FILE_MAX_AGE_SECONDS is removed.
+    
+    Returns:
+        int: Number of files and directories removed
+    """
+    cutoff = time.time() - SESSION_FILE_MAX_AGE_SECONDS
+    removed = 0
+    try:
+        entries = list(os.scandir(tempfile.gettempdir()))
+    except OSError:
+        return 0
+    for entry in entries:
+        if not entry.name.startswith(SESSION_FILE_PREFIX):
+            continue
+        try:
+            if entry.stat(follow_symlinks=False).st_mtime >= cutoff:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.remove(entry.path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _spill_to_session_file(key: str, content: str) -> str:
+    """
+    Write text to a temporary file and keep only its path in the session state.
+    
+    Follow-up questions search this file instead of a full copy of the log
+    held in st.session_state for the lifetime of the session. A file stored
+    earlier under the same key is removed first; files live in the session's
+    SessionFiles directory, which is removed when the session ends.
+    
+    Args:
+        key: Session state key for the path ('raw_log_path' or 'final_processed_path')
+        content: Text to store
+        
+    Returns:
+        Path of the written UTF-8 file
+    """
+    _remove_session_file(key)
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", newline="\n", dir=_session_files_dir(), suffix=".log", delete=False
+    ) as tmp:
+        _write_text_in_slices(tmp, content)
+    st.session_state[key] = tmp.name
+    return tmp.name
+
+
+def _write_text_in_slices(f: TextIO, content: str):
+    """
+    Write text to a file WRITE_SLICE_CHARS characters at a time.
+    
+    A single write() encodes the whole string into one bytes object first,
+    briefly holding a second full-size copy of the log; slicing keeps the
+    extra memory to one slice.
+    
+    Args:
+        f: Text file opened for writing
+        content: Text to write
+    """
+    for start in range(0, len(content), WRITE_SLICE_CHARS):
+        f.write(content[start:start + WRITE_SLICE_CHARS])
+
+
+def _remove_session_file(key: str):
+    """
+    Delete the temporary file stored under a session state key, if any.
+    
+    Args:
+        key: Session state key holding the file path
+    """
+    path = st.session_state.pop(key, None)
+    # The final content of direct processing shares the raw log file
+    if path and path not in (st.session_state.get('raw_log_path'), st.session_state.get('final_processed_path')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def clear_session_files():
+    """Delete the raw and processed log files kept for the current session."""
+    _remove_session_file('final_processed_path')
+    _remove_session_file('raw_log_path')
+
+
+def _filter_cache_dir(log_content: str, stage: str) -> str:
+    """
+    Directory holding the cached filtering result of log content.
+    
+    Args:
+        log_content: Combined log content
+        stage: Filtering stage ("turbo" or "basic")
+        
+    Returns:
+        Path under FILTER_CACHE_DIR keyed by content digest, stage and PIPELINE_VERSION
+    """
+    return os.path.join(FILTER_CACHE_DIR, f"{_content_digest(log_content).hex()}-{stage}-v{PIPELINE_VERSION}")
+
+
+def load_filter_result(cache_dir: str) -> Optional[Tuple[str, dict]]:
+    """
+    Load a filtering result stored by store_filter_result().
+    
+    Args:
+        cache_dir: Directory from _filter_cache_dir()
+        
+    Returns:
+        Tuple of (filtered_content, stats), or None if nothing usable is cached
+    """
+    try:
+        # stats.json is written last, so its presence means filtered.txt is complete
+        with open(os.path.join(cache_dir, "stats.json"), encoding="utf-8") as f:
+            stats = json.load(f)
+        with open(os.path.join(cache_dir, "filtered.txt"), encoding="utf-8", newline="\n") as f:
+            filtered_content = f.read()
+        # Mark as recently used for pruning
+        os.utime(cache_dir)
+    except (OSError, ValueError):
+        return None
+    return filtered_content, stats
+
+
+def store_filter_result(cache_dir: str, filtered_content: str, stats: dict):
+    """
+    Cache a filtering result on disk and prune old results.
+    
+    Args:
+        cache_dir: Directory from _filter_cache_dir()
+        filtered_content: Filtered log content
+        stats: JSON-serializable filtering statistics
+        
+    Note:
+        - If the cache directory cannot be written (read-only home, full disk)
+          the result is simply not cached
+        - Both files are written with write_file_atomic(); stats.json goes last,
+          so load_filter_result() never pairs it with an older filtered.txt
+    """
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        write_file_atomic(
+            os.path.join(cache_dir, "filtered.txt"),
+            lambda f: _write_text_in_slices(f, filtered_content)
+        )
+        write_file_atomic(os.path.join(cache_dir, "stats.json"), lambda f: json.dump(stats, f))
+    except OSError:
+        return
+    prune_cache_entries(FILTER_CACHE_DIR, FILTER_CACHE_MAX_ENTRIES, match=lambda entry: entry.is_dir())
+
+
+def count_routing_tokens(log_content: str, model: str = "gpt-4") -> Tuple[int, bool]:
+    """
+    Determine the token count used to pick a processing tier.
+    
+    Uses the character-based estimate unless it lands close to one of the tier
+    boundaries, in which case the exact tiktoken count is computed so the
+    routing decision stays correct.
+    
+    Args:
+        log_content: Combined log content
+        model: Model name for exact token counting
+        
+    Returns:
+        Tuple of (token_count, is_estimate)
+    """
+    estimate = estimate_tokens_fast(log_content)
+    if (abs(estimate - TOKEN_THRESHOLD_FILTERING) < ESTIMATE_MARGIN_FILTERING
+            or abs(estimate - TOKEN_THRESHOLD_TURBO_FILTERING) < ESTIMATE_MARGIN_TURBO_FILTERING):
+        return count_tokens(log_content, model), False
+    return estimate, True
+
+
+def count_chunking_tokens(content: str, model: str) -> Tuple[int, bool]:
+    """
+    Determine the token count used to choose between one call and chunking.
+    
+    Content whose estimate is clearly below MAX_TOKENS_PER_CHUNK takes the
+    single-call path without running the tokenizer; otherwise the exact count
+    decides.
+    
+    Args:
+        content: Content that will be sent to the LLM
+        model: Model name for exact token counting
+        
+    Returns:
+        Tuple of (token_count, is_estimate)
+    """
+    estimate = estimate_tokens_fast(content)
+    if estimate < CHUNK_ESTIMATE_SAFE_FRACTION * MAX_TOKENS_PER_CHUNK:
+        return estimate, True
+    return count_tokens(content, model), False
+
+
 def process_logs_smart(
     log_content: str, 
-    llm_handler: LLMHandler,
+    llm_handler: "LLMHandler",
     progress_callback=None,
-    force_metrics_only: bool = False
-) -> str:
+    force_metrics_only: bool = False,
+    batch_mode: bool = False,
+    total_tokens: Optional[int] = None
+) -> Tuple[str, int]:
     """
     Intelligently process logs based on size - TWO TIER APPROACH with Smart Filtering.
     
@@ -345,26 +713,36 @@ def process_logs_smart(
         llm_handler: LLM handler instance
         progress_callback: Optional callback for progress updates
         force_metrics_only: Force metrics-only analysis regardless of size (still available as option)
+        batch_mode: Submit the chunks of large (turbo tier) files to the OpenAI Batch API
+                    instead of summarizing them interactively
+        total_tokens: Token count used to pick the tier, e.g. from count_routing_tokens();
+                      counted exactly when omitted
+        
+    Note:
+        - Reduction figures in progress messages use estimate_tokens_fast(); the
+          tokenizer only runs where a count decides between one call and chunking
         
     Returns:
-        Final summary (LLM-generated or metrics-based)
+        Tuple of (final summary (LLM-generated or metrics-based), tokens of the
+        content sent to the LLM after filtering; 0 for metrics-only analysis)
     """
-    # Count tokens
-    total_tokens = count_tokens(log_content, llm_handler.model)
+    # Count tokens (unless the caller already routed on a count)
+    if total_tokens is None:
+        total_tokens = count_tokens(log_content, llm_handler.model)
     
     if progress_callback:
         progress_callback(f"📊 Analyzing {total_tokens:,} tokens...")
     
-    # Cache raw content for follow-up questions (direct or filtered later)
-    # Cache raw content for follow-up questions (direct or filtered later)
-    st.session_state['raw_log_content'] = log_content
+    # Keep raw content on disk for follow-up questions (direct or filtered later)
+    _remove_session_file('final_processed_path')
+    _spill_to_session_file('raw_log_path', log_content)
 
     # Strategy 0: Metrics-only analysis (only if forced by user)
     if force_metrics_only:
         if progress_callback:
             progress_callback("🔍 Forced metrics-only analysis...")
         llm_handler.set_processing_method("Metrics-only")
-        return process_with_metrics_only(log_content, progress_callback)
+        return process_with_metrics_only(log_content, progress_callback), 0
     
     # Strategy 1: Direct processing (< 150K tokens)
     elif total_tokens < TOKEN_THRESHOLD_FILTERING:
@@ -372,14 +750,16 @@ def process_logs_smart(
             progress_callback("🚀 Processing directly...")
         llm_handler.set_processing_method("Direct")
         
-        if total_tokens <= MAX_TOKENS_PER_CHUNK:
-            summary = llm_handler.generate_summary(log_content, SYSTEM_PROMPT)
-            st.session_state['final_processed_content'] = log_content
-            return summary
+        llm_content = collapse_llm_input(log_content, progress_callback)
+        content_tokens, _ = count_chunking_tokens(llm_content, llm_handler.model)
+        if content_tokens <= MAX_TOKENS_PER_CHUNK:
+            summary = llm_handler.generate_summary(llm_content, SYSTEM_PROMPT)
+            st.session_state['final_processed_path'] = st.session_state['raw_log_path']
+            return summary, content_tokens
         else:
-            processed = process_with_chunking(log_content, llm_handler, progress_callback)
-            st.session_state['final_processed_content'] = log_content
-            return processed
+            processed = process_with_chunking(llm_content, llm_handler, progress_callback)
+            st.session_state['final_processed_path'] = st.session_state['raw_log_path']
+            return processed, content_tokens
     
     # Strategy 2: Turbo filtered processing (>= 500K tokens)
     elif total_tokens >= TOKEN_THRESHOLD_TURBO_FILTERING:
@@ -387,43 +767,65 @@ def process_logs_smart(
             progress_callback("🚀 Applying turbo filtering for large files...")
         llm_handler.set_processing_method("ID-Based Turbo")
         
-        # Fast preprocessing: Remove extremely verbose lines first
-        if progress_callback:
-            progress_callback("⚡ Fast preprocessing...")
-        
-        preprocessed_content = fast_preprocess_content(log_content)
-        preprocessed_tokens = count_tokens(preprocessed_content, llm_handler.model)
-        
-        if progress_callback:
-            preprocess_reduction = (1 - preprocessed_tokens / total_tokens) * 100
-            tokens_saved_preprocess = total_tokens - preprocessed_tokens
-            progress_callback(f"⚡ Preprocessed: {preprocess_reduction:.1f}% reduction ({total_tokens:,} → {preprocessed_tokens:,} tokens)")
-            progress_callback(f"🗑️ Noise removed: {tokens_saved_preprocess:,} tokens of verbose content")
-        
-        # Apply turbo filtering (always use turbo mode for large files)
-        if progress_callback:
-            progress_callback("🚀 ID-based turbo filtering...")
-        
-        filtered_content, reduction_stats = create_turbo_filtered_content_with_stats(preprocessed_content)
-        filtered_tokens = count_tokens(filtered_content, llm_handler.model)
+        cache_dir = _filter_cache_dir(log_content, "turbo")
+        cached = load_filter_result(cache_dir)
+        if cached is not None:
+            if progress_callback:
+                progress_callback("♻️ Reusing turbo filtering results from an earlier run...")
+            filtered_content, reduction_stats = cached
+        else:
+            # Fast preprocessing removes extremely verbose lines first; its output streams
+            # line by line into turbo filtering (always used for large files), with the
+            # preprocessed size measured on the way instead of joining the lines
+            if progress_callback:
+                progress_callback("⚡ Fast preprocessing + ID-based turbo filtering...")
+            
+            raw_log_path = st.session_state['raw_log_path']
+            if PARALLEL_FILTER_WORKERS > 1 and os.path.getsize(raw_log_path) >= PARALLEL_FILTER_MIN_BYTES:
+                # Very large logs: both passes run on worker processes reading the spilled file
+                filtered_content, reduction_stats, preprocessed_estimate = create_turbo_filtered_file_with_stats(raw_log_path)
+            else:
+                preprocessed_lines = LineTokenCounter(fast_preprocess_content(iter_lines(log_content)))
+                filtered_content, reduction_stats = create_turbo_filtered_content_with_stats(preprocessed_lines)
+                preprocessed_estimate = preprocessed_lines.tokens
+            reduction_stats['preprocessed_estimate'] = preprocessed_estimate
+            store_filter_result(cache_dir, filtered_content, reduction_stats)
+        llm_content = collapse_llm_input(filtered_content, progress_callback)
+        filtered_tokens, _ = count_chunking_tokens(llm_content, llm_handler.model)
         
         if progress_callback:
-            total_reduction = (1 - filtered_tokens / total_tokens) * 100
-            tokens_saved = total_tokens - filtered_tokens
-            progress_callback(f"✂️ Turbo filtered: {total_reduction:.1f}% reduction ({total_tokens:,} → {filtered_tokens:,} tokens)")
-            progress_callback(f"� Tokens saved: {tokens_saved:,} tokens (${tokens_saved * 0.000015:.4f} cost savings)")
+            # Reduction figures only need estimates (the tier is already chosen)
+            raw_estimate = estimate_tokens_fast(log_content)
+            filtered_estimate = estimate_tokens_fast(llm_content)
+            
+            preprocessed_estimate = reduction_stats['preprocessed_estimate']
+            
+            preprocess_reduction = (1 - preprocessed_estimate / raw_estimate) * 100
+            tokens_saved_preprocess = raw_estimate - preprocessed_estimate
+            progress_callback(f"⚡ Preprocessed: {preprocess_reduction:.1f}% reduction (~{raw_estimate:,} → ~{preprocessed_estimate:,} tokens)")
+            progress_callback(f"🗑️ Noise removed: ~{tokens_saved_preprocess:,} tokens of verbose content")
+            
+            total_reduction = (1 - filtered_estimate / raw_estimate) * 100
+            tokens_saved = raw_estimate - filtered_estimate
+            progress_callback(f"✂️ Turbo filtered: {total_reduction:.1f}% reduction (~{raw_estimate:,} → ~{filtered_estimate:,} tokens)")
+            progress_callback(f"� Tokens saved: ~{tokens_saved:,} tokens (${tokens_saved * 0.000015:.4f} cost savings)")
             progress_callback(f"📊 Line reduction: {reduction_stats['line_reduction']:.1f}% ({reduction_stats['original_lines']:,} → {reduction_stats['filtered_lines']:,} lines)")
             progress_callback(f"🎯 Critical events preserved: {reduction_stats['critical_events_kept']} | Less critical sampled: {reduction_stats['less_critical_sampled']}")
         
         # Process filtered content with LLM
-        if filtered_tokens <= MAX_TOKENS_PER_CHUNK:
-            summary = llm_handler.generate_summary(filtered_content, SYSTEM_PROMPT)
-            st.session_state['final_processed_content'] = filtered_content
-            return summary
+        if batch_mode and filtered_tokens > MAX_TOKENS_PER_CHUNK:
+            llm_handler.set_processing_method("ID-Based Turbo (Batch API)")
+            submitted = process_with_batch_api(llm_content, llm_handler, progress_callback)
+            _spill_to_session_file('final_processed_path', filtered_content)
+            return submitted, filtered_tokens
+        elif filtered_tokens <= MAX_TOKENS_PER_CHUNK:
+            summary = llm_handler.generate_summary(llm_content, SYSTEM_PROMPT)
+            _spill_to_session_file('final_processed_path', filtered_content)
+            return summary, filtered_tokens
         else:
-            processed = process_with_chunking(filtered_content, llm_handler, progress_callback)
-            st.session_state['final_processed_content'] = filtered_content
-            return processed
+            processed = process_with_chunking(llm_content, llm_handler, progress_callback)
+            _spill_to_session_file('final_processed_path', filtered_content)
+            return processed, filtered_tokens
     
     # Strategy 3: Basic filtered processing (150K - 500K tokens)
     else:
@@ -432,97 +834,93 @@ def process_logs_smart(
         llm_handler.set_processing_method("Basic Filtered")
         
         # Apply basic filtering (existing filter_log_content function)
-        filtered_content = filter_log_content(log_content)
-        filtered_tokens = count_tokens(filtered_content, llm_handler.model)
+        cache_dir = _filter_cache_dir(log_content, "basic")
+        cached = load_filter_result(cache_dir)
+        if cached is not None:
+            filtered_content, _ = cached
+        else:
+            filtered_content = filter_log_content(log_content)
+            store_filter_result(cache_dir, filtered_content, {})
+        llm_content = collapse_llm_input(filtered_content, progress_callback)
+        filtered_tokens, _ = count_chunking_tokens(llm_content, llm_handler.model)
         
         if progress_callback:
-            reduction = (1 - filtered_tokens / total_tokens) * 100
-            tokens_saved = total_tokens - filtered_tokens
-            progress_callback(f"✂️ Basic filtered: {reduction:.1f}% reduction ({total_tokens:,} → {filtered_tokens:,} tokens)")
-            progress_callback(f"💾 Tokens saved: {tokens_saved:,} tokens (${tokens_saved * 0.000015:.4f} estimated cost savings)")
+            # Reduction figures only need estimates (the tier is already chosen)
+            raw_estimate = estimate_tokens_fast(log_content)
+            filtered_estimate = estimate_tokens_fast(llm_content)
+            reduction = (1 - filtered_estimate / raw_estimate) * 100
+            tokens_saved = raw_estimate - filtered_estimate
+            progress_callback(f"✂️ Basic filtered: {reduction:.1f}% reduction (~{raw_estimate:,} → ~{filtered_estimate:,} tokens)")
+            progress_callback(f"💾 Tokens saved: ~{tokens_saved:,} tokens (${tokens_saved * 0.000015:.4f} estimated cost savings)")
         
         # Process filtered content with LLM
         if filtered_tokens <= MAX_TOKENS_PER_CHUNK:
-            summary = llm_handler.generate_summary(filtered_content, SYSTEM_PROMPT)
-            st.session_state['final_processed_content'] = filtered_content
-            return summary
+            summary = llm_handler.generate_summary(llm_content, SYSTEM_PROMPT)
+            _spill_to_session_file('final_processed_path', filtered_content)
+            return summary, filtered_tokens
         else:
-            processed = process_with_chunking(filtered_content, llm_handler, progress_callback)
-            st.session_state['final_processed_content'] = filtered_content
-            return processed
+            processed = process_with_chunking(llm_content, llm_handler, progress_callback)
+            _spill_to_session_file('final_processed_path', filtered_content)
+            return processed, filtered_tokens
+
+
+def collapse_llm_input(content: str, progress_callback=None) -> str:
+    """
+    Fold repeated log lines of the content about to be sent to the LLM.
+    
+    Args:
+        content: Raw (direct tier) or filtered log content
+        progress_callback: Optional callback for progress updates
+        
+    Returns:
+        str: Content with runs of identical lines folded to one "[xN]" line
+        
+    Note:
+        - Only the LLM input is collapsed; the content spilled for follow-up
+          questions and evidence lookups keeps every line
+    """
+    collapsed, folded = collapse_repeated_lines(content)
+    if folded and progress_callback:
+        progress_callback(f"🔁 Repeated lines folded: {folded:,} consecutive duplicates collapsed to [xN] lines")
+    return collapsed
 
 
-def fast_preprocess_content(log_content: str) -> str:
+def fast_preprocess_content(lines: Iterable[str]) -> Iterator[str]:
     """
     Ultra-fast preprocessing to remove extremely verbose lines before smart filtering.
     This removes the most obvious noise very quickly.
     
     Args:
-        log_content: Raw log content
+        lines: Raw log lines (e.g. from iter_lines); a str is split into lines
         
     Returns:
-        Preprocessed content with most verbose noise removed
+        Iterator over the lines left after removing the most verbose noise
+        
+    Note:
+        - Runs as a generator so the lines can stream straight into the
+          turbo filter without building the preprocessed text in memory
+        - The last lines are only known once the input ends, so the most
+          recent PREPROCESS_PRESERVE_LAST_LINES lines are held back until then
+        - The noise rules are applied by log_processor.preprocess_lines(), which
+          create_turbo_filtered_file_with_stats() also runs on worker processes
     """
-    lines = log_content.split('\n')
-    filtered_lines = []
+    if isinstance(lines, str):
+        lines = iter_lines(lines)
     
     # IMPORTANT: Always preserve first and last portions of the log
-    PRESERVE_FIRST_LINES = 50   # Keep first 50 lines (startup, initialization)
-    PRESERVE_LAST_LINES = 50    # Keep last 50 lines (shutdown, final events)
-    total_lines = len(lines)
-    
-    # Define patterns to skip entirely (most verbose noise)
-    skip_patterns = [
-        'Interface-Statistic',  # Network statistics
-        'MqttClient: Publishing',  # MQTT spam
-        'MqttClient: Connecting',  # MQTT connection spam
-        'Checksum validated',  # SFTP spam
-        'SFTP connect to server',  # SFTP details
-        'Start time update',  # Time sync spam
-        'Time update finished',  # Time sync spam
-        'Time update succeeded',  # More time sync
-        'Mail finished',  # Routine email success
-        'Interface [',  # Interface status spam
-        'Transfer Status:',  # Transfer statistics
-        'Medium Status:',  # Medium statistics
-    ]
-    
-    # Skip lines that contain debug/trace keywords
-    debug_keywords = ['debug', 'trace', 'verbose']
-    
-    line_count = 0
-    for line in lines:
-        line_count += 1
-        
-        # Always keep first and last portions (critical context)
-        if line_count <= PRESERVE_FIRST_LINES or line_count > (total_lines - PRESERVE_LAST_LINES):
-            filtered_lines.append(line)
-            continue
-        
-        # Skip empty lines
-        if not line.strip():
-            continue
-            
-        # Skip extremely verbose patterns (fastest check first)
-        line_lower = line.lower()
-        if any(keyword in line_lower for keyword in debug_keywords):
-            continue
-            
-        # Skip specific noise patterns
-        if any(pattern in line for pattern in skip_patterns):
-            continue
-            
-        # Skip lines that are too long (likely debug spam)
-        if len(line) > 1000:
-            continue
-            
-        # Skip repetitive status messages more aggressively
-        if line_count % 5 == 0 and any(status in line for status in ['Status:', '0x00000530', '0x00000640']):
-            continue  # Keep only every 5th status message during preprocessing
-            
-        filtered_lines.append(line)
+    tail = deque()
+    
+    def leading_lines() -> Iterator[str]:
+        """Pass lines on once enough later lines follow them to rule out the tail."""
+        for incoming in lines:
+            tail.append(incoming)
+            if len(tail) > PREPROCESS_PRESERVE_LAST_LINES:
+                yield tail.popleft()
+    
+    yield from preprocess_lines(leading_lines())
     
-    return '\n'.join(filtered_lines)
+    # The held-back lines are the last lines of the log
+    yield from tail
 
 
 def create_turbo_filtered_content(log_content: str) -> str:
@@ -541,50 +939,105 @@ def create_turbo_filtered_content(log_content: str) -> str:
     return content
 
 
-def create_turbo_filtered_content_with_stats(log_content: str) -> tuple[str, dict]:
+def create_turbo_filtered_content_with_stats(lines: Iterable[str]) -> tuple[str, dict]:
     """
     OPTIMIZED TURBO MODE with detailed statistics tracking.
     ID-based intelligent filtering for large files (over 500,000 tokens).
     
     Args:
-        log_content: Preprocessed log content
+        lines: Preprocessed log lines (e.g. from fast_preprocess_content);
+               a str is split into lines
         
     Returns:
         Tuple of (filtered_content, reduction_statistics)
+        
+    Note:
+        - Lines are classified column-wise by log_processor.classify_turbo_block(),
+          so the regex work runs in native code instead of a Python loop per line
+        - Input is consumed in blocks of TURBO_BLOCK_LINES, so only one block is
+          held as a Series at a time; line numbers and the less-critical sampling
+          counter carry over between blocks
+        - Rule priority matches the documented order; a line is attributed to
+          the first rule it matches
     """
-    import re
-    
-    # Critical IDs - Always keep (100% retention)
-    CRITICAL_IDS = {
-        '0x000003FF', '0x00000496', '0x00000497', '0x000004A1', '0x000004A5',
-        '0x000004B1', '0x00000522', '0x000004E2', '0x000005F0', '0x000005F8',
-        '0x00000610', '0x000004D0', '0x000004F0', '0x00000500', '0x00000508',
-        # Core measurement and system IDs
-        '0x00000485', '0x000003F9', '0x000003FA'  # Measurement events
-    }
-    
-    # Less Critical IDs - Selective keep (25% sampling)
-    LESS_CRITICAL_IDS = {
-        '0x000004D8', '0x000004E0', '0x000004E8', '0x00000510', '0x00000479',
-        '0x0000047B', '0x0000047D', '0x00000488', '0x00000489', '0x0000048A',
-        '0x00000023', '0x00000024', '0x00000490', '0x000005FB', '0x000005FC'
-    }
+    if isinstance(lines, str):
+        lines = iter_lines(lines)
+    
+    def classified_blocks():
+        """Classify full blocks as they arrive; the total is only known for the last block."""
+        # Always hold back enough lines that the last TURBO_PRESERVE_LAST_LINES
+        # lines end up in the final block
+        pending = []
+        first_line = 1
+        for line in lines:
+            pending.append(line)
+            if len(pending) == TURBO_BLOCK_LINES + TURBO_PRESERVE_LAST_LINES:
+                yield classify_turbo_block(pending[:TURBO_BLOCK_LINES], first_line)
+                del pending[:TURBO_BLOCK_LINES]
+                first_line += TURBO_BLOCK_LINES
+        yield classify_turbo_block(pending, first_line, first_line + len(pending) - 1)
+    
+    return assemble_turbo_filtered_content(classified_blocks())
+
+
+def create_turbo_filtered_file_with_stats(path: str, workers: int = PARALLEL_FILTER_WORKERS) -> tuple[str, dict, int]:
+    """
+    Fast preprocessing and turbo filtering of a log file on several processes.
     
-    # Essential patterns (always keep)
-    critical_patterns = re.compile(r'(E 0x|Failed|Error|Exception|WLAN Disconnected)', re.IGNORECASE)
-    essential_events = re.compile(r'(CheckDisk|Configuration|User event|Power|Measurement start)', re.IGNORECASE)
+    The file is split into byte ranges of whole lines. Each worker process
+    preprocesses one range straight from the file, then turbo filters the
+    preprocessed lines of one range. Workers are given the line numbers of
+    their range, so the line sampling and first/last line preservation give
+    exactly the output of fast_preprocess_content() followed by
+    create_turbo_filtered_content_with_stats().
     
-    lines = log_content.split('\n')
-    filtered_lines = []
-    original_lines = len(lines)
+    Args:
+        path: UTF-8 log file (e.g. the raw_log_path session file)
+        workers: Number of worker processes
+        
+    Returns:
+        Tuple of (filtered_content, reduction_statistics, preprocessed_token_estimate)
+        
+    Note:
+        - Workers are spawned rather than forked: the Streamlit server runs
+          several threads, and a forked copy can deadlock on their locks
+        - Starting the workers costs around a second, so this only pays off
+          for logs of PARALLEL_FILTER_MIN_BYTES and more
+    """
+    ranges, total_lines = split_file_ranges(path, workers)
+    starts, stops, first_lines = zip(*ranges)
+    
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        preprocessed = list(pool.map(
+            preprocess_file_range, repeat(path), starts, stops, first_lines, repeat(total_lines)
+        ))
+        texts, line_counts = zip(*preprocessed)
+        
+        # Turbo filtering numbers the preprocessed lines
+        classified = pool.map(
+            turbo_filter_range, texts, line_counts,
+            accumulate(line_counts[:-1], initial=1), repeat(sum(line_counts))
+        )
+        filtered_content, stats = assemble_turbo_filtered_content(chain.from_iterable(classified))
     
-    # IMPORTANT: Always preserve first and last portions of the log
-    PRESERVE_FIRST_LINES = 100  # Keep first 100 lines (startup, initialization)
-    PRESERVE_LAST_LINES = 100   # Keep last 100 lines (shutdown, final events)
+    # Same estimate LineTokenCounter gives for the joined lines
+    preprocessed_chars = sum(len(text) + 1 for text, line_count in preprocessed if line_count) - 1
+    return filtered_content, stats, max(preprocessed_chars, 0) // 4
+
+
+def assemble_turbo_filtered_content(classified_blocks: Iterable[tuple]) -> tuple[str, dict]:
+    """
+    Join classified turbo filtering blocks into the filtered content.
     
+    Args:
+        classified_blocks: classify_turbo_block() results in log order
+        
+    Returns:
+        Tuple of (filtered_content, reduction_statistics)
+    """
     # Statistics tracking
     stats = {
-        'original_lines': original_lines,
+        'original_lines': 0,
         'critical_events_kept': 0,
         'less_critical_sampled': 0,
         'essential_patterns_kept': 0,
@@ -596,88 +1049,34 @@ def create_turbo_filtered_content_with_stats(log_content: str) -> tuple[str, dic
         'line_reduction': 0.0,
         'lines_removed': 0
     }
-    
-    line_count = 0
-    less_critical_sample_count = 0
-    
-    for line in lines:
-        line_count += 1
-        
-        if not line.strip():
-            continue
-        
-        # 0. ALWAYS KEEP: First and last portions of log (critical for context)
-        if line_count <= PRESERVE_FIRST_LINES or line_count > (original_lines - PRESERVE_LAST_LINES):
-            filtered_lines.append(line)
-            stats['first_last_preserved'] += 1
-            continue
-        
-        # 1. ALWAYS KEEP: File boundaries and headers
-        if any(marker in line for marker in ['===== ', 'IPEmotionRT', 'Logger type:', 'Serial number:', 'Configuration file:']):
-            filtered_lines.append(line)
-            stats['headers_kept'] += 1
-            continue
-        
-        # 2. ALWAYS KEEP: Critical ID patterns
-        critical_id_found = False
-        for critical_id in CRITICAL_IDS:
-            if critical_id in line:
-                filtered_lines.append(line)
-                stats['critical_events_kept'] += 1
-                critical_id_found = True
-                break
+    # Surviving lines are written straight into one buffer block by block
+    filtered = io.StringIO()
+    filtered_lines_count = 0
+    less_critical_seen = 0
+    
+    for block_lines, less_critical_ordinals, counts in classified_blocks:
+        # 5. SELECTIVE KEEP: Less critical IDs (25% sampling - every 4th occurrence)
+        kept_lines = []
+        for line, ordinal in zip(block_lines, less_critical_ordinals):
+            if ordinal:
+                if (less_critical_seen + ordinal) % 4:
+                    continue
+                stats['less_critical_sampled'] += 1
+            kept_lines.append(line)
+        less_critical_seen += counts.pop('less_critical_lines')
         
-        if critical_id_found:
-            continue
-        
-        # 3. ALWAYS KEEP: Critical error patterns
-        if critical_patterns.search(line):
-            filtered_lines.append(line)
-            stats['essential_patterns_kept'] += 1
-            continue
-        
-        # 4. ALWAYS KEEP: Essential system events
-        if essential_events.search(line):
-            filtered_lines.append(line)
-            stats['essential_patterns_kept'] += 1
-            continue
-        
-        # 5. SELECTIVE KEEP: Less critical IDs (25% sampling)
-        less_critical_found = False
-        for less_critical_id in LESS_CRITICAL_IDS:
-            if less_critical_id in line:
-                less_critical_sample_count += 1
-                # Keep every 4th occurrence (25% sampling)
-                if less_critical_sample_count % 4 == 0:
-                    filtered_lines.append(line)
-                    stats['less_critical_sampled'] += 1
-                less_critical_found = True
-                break
-        
-        if less_critical_found:
-            continue
-        
-        # 6. KEEP: High CPU usage alerts (>80%)
-        if 'CPU:' in line and 'Status:' in line:
-            # Extract CPU percentage
-            cpu_match = re.search(r'CPU:\s*(\d+)%', line)
-            if cpu_match and int(cpu_match.group(1)) > 80:
-                filtered_lines.append(line)
-                stats['high_cpu_alerts_kept'] += 1
-                continue
+        for key, count in counts.items():
+            stats[key] += count
         
-        # 7. AGGRESSIVE SAMPLING: Other content (5% sampling)
-        if line_count % 20 == 0:  # Keep every 20th line (5%)
-            # Prioritize lines with important keywords
-            if any(keyword in line for keyword in ['WLAN', 'Timeout', 'Protocol', 'Transfer', 'Status:', 'Mail']):
-                filtered_lines.append(line)
-                stats['routine_sampled'] += 1
-                continue
+        if kept_lines:
+            if filtered_lines_count:
+                filtered.write('\n')
+            filtered.write('\n'.join(kept_lines))
+            filtered_lines_count += len(kept_lines)
     
-    filtered_content = '\n'.join(filtered_lines)
+    original_lines = stats['original_lines']
     
     # Calculate final statistics
-    filtered_lines_count = len(filtered_lines)
     line_reduction = ((original_lines - filtered_lines_count) / original_lines) * 100 if original_lines > 0 else 0
     
     stats['filtered_lines'] = filtered_lines_count
@@ -703,18 +1102,18 @@ def create_turbo_filtered_content_with_stats(log_content: str) -> tuple[str, dic
 # - High CPU alerts: {stats['high_cpu_alerts_kept']}
 # - Routine content (sampled): {stats['routine_sampled']}
 #
-# Critical IDs monitored: {len(CRITICAL_IDS)}
-# Less critical IDs monitored: {len(LESS_CRITICAL_IDS)}
+# Critical IDs monitored: {len(TURBO_CRITICAL_IDS)}
+# Less critical IDs monitored: {len(TURBO_LESS_CRITICAL_IDS)}
 # ===============================
 
 """
     
-    return metrics_header + filtered_content, stats
+    return metrics_header + filtered.getvalue(), stats
 
 
 def process_with_chunking(
     content: str,
-    llm_handler: LLMHandler,
+    llm_handler: "LLMHandler",
     progress_callback=None
 ) -> str:
     """
@@ -728,61 +1127,58 @@ def process_with_chunking(
     Returns:
         Final combined summary
     """
-    # Model-specific rate limit configurations
-    # GPT-4.1: 30K TPM, GPT-5: 500K TPM
-    is_gpt5 = llm_handler.model == "gpt-5"
-    
-    if is_gpt5:
-        # GPT-5 has 500K TPM limit - can use much larger chunks
-        base_chunk_size = 80000  # 80K tokens per chunk
-        larger_chunk_size = 100000  # 100K for optimization
-        ultra_chunk_size = 120000  # 120K for ultra-optimization
-        delay_seconds = 0  # No delay needed with 500K TPM limit
-    else:
-        # GPT-4.1 has 30K TPM limit - use conservative chunks
-        base_chunk_size = MAX_TOKENS_PER_CHUNK  # 20K tokens
-        larger_chunk_size = 23000  # 23K max
-        ultra_chunk_size = 22000  # 22K max
-        delay_seconds = 3  # 3-second delay between chunks
+    # Chunk size adapts to the measured latency of earlier calls to this model,
+    # within the model's bounds and TPM headroom (GPT-4.1: 30K TPM, GPT-5: 500K TPM)
+    chunk_sizer = llm_handler.chunk_sizer
+    prompt_overhead = count_prompt_tokens(SYSTEM_PROMPT, llm_handler.model) + CHUNK_PROMPT_OVERHEAD_TOKENS
+    chunk_size = chunk_sizer.chunk_tokens(prompt_overhead)
     
-    chunks = chunk_text_by_tokens(content, base_chunk_size, llm_handler.model)
+    # Tokenize once; re-chunking with a larger size reuses the per-line counts
+    line_tokens = count_line_tokens(content, llm_handler.model)
+    chunks = chunk_text_by_tokens(content, chunk_size, llm_handler.model, line_tokens)
     
     if progress_callback:
-        progress_callback(f"📦 Split into {len(chunks)} chunks")
+        progress_callback(f"📦 Split into {len(chunks)} chunks of up to {chunk_size:,} tokens")
     
-    # If we have too many chunks, reduce them by increasing chunk size (but stay within rate limits)
-    if len(chunks) > 8:  # Reduced threshold from 10 to 8
+    # If we have too many chunks, reduce them with the largest allowed chunk size
+    max_chunk_size = chunk_sizer.max_chunk_tokens(prompt_overhead)
+    if len(chunks) > 8 and chunk_size < max_chunk_size:
         if progress_callback:
-            progress_callback(f"⚡ Optimizing chunk count ({len(chunks)} → target ~6 chunks)...")
-        chunks = chunk_text_by_tokens(content, larger_chunk_size, llm_handler.model)
+            progress_callback(f"⚡ Optimizing chunk count ({len(chunks)} chunks, up to {max_chunk_size:,} tokens each)...")
+        chunks = chunk_text_by_tokens(content, max_chunk_size, llm_handler.model, line_tokens)
         if progress_callback:
             progress_callback(f"📦 Optimized to {len(chunks)} chunks")
     
-    # For very large files, don't exceed rate limits
-    if len(chunks) > 12:
-        if progress_callback:
-            progress_callback(f"🚀 Ultra-optimizing for large file ({len(chunks)} chunks)...")
-        chunks = chunk_text_by_tokens(content, ultra_chunk_size, llm_handler.model)
-        if progress_callback:
-            progress_callback(f"📦 Ultra-optimized to {len(chunks)} chunks")
-    
-    # Summarize each chunk with progress
-    chunk_summaries = []
-    for i, chunk in enumerate(chunks):
-        if progress_callback:
-            progress_percentage = ((i + 1) / len(chunks)) * 80  # Reserve 20% for final combination
-            progress_callback(f"🔄 Processing chunk {i+1}/{len(chunks)} ({progress_percentage:.0f}%)...")
-        
-        summary = llm_handler.summarize_chunk(
-            chunk, SYSTEM_PROMPT, i+1, len(chunks)
+    # Group neighbouring chunks so several are summarized per request
+    batches = llm_handler.plan_chunk_batches(chunks)
+    if progress_callback and len(batches) < len(chunks):
+        progress_callback(f"📦 Batched {len(chunks)} chunks into {len(batches)} requests")
+    
+    # Summarize batches concurrently; results are stored by chunk index so the
+    # summaries keep the original chunk order. Requests are paced by the
+    # handler's TPM/RPM limiters, and its adaptive concurrency limit backs off
+    # on rate limit errors, so no fixed delays or per-model worker counts apply.
+    def summarize(batch: List[int]) -> List[str]:
+        return llm_handler.batch_summarize_chunks(
+            [chunks[i] for i in batch], SYSTEM_PROMPT, batch[0] + 1, len(chunks)
         )
-        chunk_summaries.append(summary)
-        
-        # Add delay between chunks to respect TPM rate limit (GPT-4.1: 30K TPM, GPT-5: 500K TPM)
-        # Only delay for GPT-4.1 to stay under limit; GPT-5 doesn't need delays
-        if i < len(chunks) - 1 and delay_seconds > 0:  # Don't wait after last chunk
-            import time
-            time.sleep(delay_seconds)
+    
+    chunk_summaries: List[Optional[str]] = [None] * len(chunks)
+    completed = 0
+    with ThreadPoolExecutor(max_workers=llm_handler.concurrency.max_limit) as executor:
+        futures = {executor.submit(summarize, batch): batch for batch in batches}
+        # Progress is reported from this (the Streamlit script) thread as batches finish
+        for future in as_completed(futures):
+            batch = futures[future]
+            for i, summary in zip(batch, future.result()):
+                chunk_summaries[i] = summary
+            completed += len(batch)
+            if progress_callback:
+                progress_percentage = (completed / len(chunks)) * 80  # Reserve 20% for final combination
+                progress_callback(
+                    f"🔄 Processed chunk {completed}/{len(chunks)} ({progress_percentage:.0f}%, "
+                    f"{llm_handler.concurrency.limit} parallel requests)..."
+                )
     
     # Combine summaries
     if progress_callback:
@@ -796,6 +1192,65 @@ def process_with_chunking(
     return final_summary
 
 
+def process_with_batch_api(
+    content: str,
+    llm_handler: "LLMHandler",
+    progress_callback=None
+) -> str:
+    """
+    Queue chunk summaries with the OpenAI Batch API instead of waiting for them.
+    
+    Batch requests cost half as much as interactive ones and have no TPM
+    pacing, at the price of asynchronous completion (up to 24 hours). The
+    batch ID is kept in st.session_state['pending_batch'] so the summary can
+    be collected later with collect_batch_summary().
+    
+    Args:
+        content: Filtered log content to summarize
+        llm_handler: LLM handler instance
+        progress_callback: Optional callback for progress updates
+        
+    Returns:
+        Status message shown in place of the summary until the batch completes
+    """
+    chunks = chunk_text_by_tokens(content, MAX_TOKENS_PER_CHUNK, llm_handler.model)
+    
+    if progress_callback:
+        progress_callback(f"📨 Submitting {len(chunks)} chunks to the Batch API...")
+    
+    batch_id = llm_handler.submit_batch(chunks, SYSTEM_PROMPT)
+    st.session_state['pending_batch'] = {'batch_id': batch_id, 'chunks': len(chunks)}
+    
+    return (
+        f"📨 **Submitted to the Batch API** - {len(chunks)} chunks queued as batch `{batch_id}`.\n\n"
+        "Batch results are usually ready well within 24 hours. "
+        "Use **Check batch status** below to retrieve the final summary."
+    )
+
+
+def collect_batch_summary(llm_handler: "LLMHandler") -> Tuple[str, Optional[str]]:
+    """
+    Poll the pending batch and combine its chunk summaries once it has completed.
+    
+    Args:
+        llm_handler: LLM handler instance that submitted the batch
+        
+    Returns:
+        Tuple of (batch status, final summary or None while still pending/failed)
+    """
+    pending = st.session_state['pending_batch']
+    status, summaries = llm_handler.retrieve_batch(pending['batch_id'])
+    if status != "completed":
+        return status, None
+    
+    if not summaries:
+        raise Exception(f"Batch {pending['batch_id']} completed without any chunk summaries")
+    if len(summaries) < pending['chunks']:
+        st.warning(f"⚠️ {pending['chunks'] - len(summaries)} of {pending['chunks']} batch requests failed - summarizing the rest")
+    
+    return status, llm_handler.combine_summaries(summaries, SYSTEM_PROMPT)
+
+
 def process_with_metrics_only(log_content: str, progress_callback=None) -> str:
     """
     Process content using only metrics extraction (no LLM).
@@ -810,9 +1265,6 @@ def process_with_metrics_only(log_content: str, progress_callback=None) -> str:
     if progress_callback:
         progress_callback("📈 Extracting key metrics...")
     
-    # Import here to avoid circular import
-    from log_processor import extract_key_metrics
-    
     # Extract metrics
     metrics = extract_key_metrics(log_content)
     
@@ -835,8 +1287,6 @@ def format_metrics_summary(metrics) -> str:
     Returns:
         Formatted summary string
     """
-    import re
-    
     summary = f"""### 🧾 General Information:
 
 **<span style='color:#4e88ff'>Software</span>**: {metrics.software_version or 'Unknown'}  
@@ -883,7 +1333,7 @@ def format_metrics_summary(metrics) -> str:
     if metrics.power_events:
         summary += f"  - **Power**: Found {len(metrics.power_events)} power-related events\n"
         for event in metrics.power_events[:3]:
-            timestamp_match = re.match(r'(\d{2}\.\d{2}\.\d{4}\s+\d{2}:\d{2}:\d{2}(?:\.\d{3,6})?)', event)
+            timestamp_match = EVENT_TIMESTAMP_RE.match(event)
             timestamp = timestamp_match.group(1) if timestamp_match else 'Unknown time'
             description = event.split(timestamp)[-1].strip() if timestamp_match else event
             summary += f"    - {timestamp} {description}\n"
@@ -914,7 +1364,7 @@ def format_metrics_summary(metrics) -> str:
     if can_events:
         summary += f"  - **CAN**: {len(can_events)} CAN-related issues found\n"
         for event in can_events[:2]:
-            timestamp_match = re.match(r'(\d{2}\.\d{2}\.\d{4}\s+\d{2}:\d{2}:\d{2}(?:\.\d{3,6})?)', event)
+            timestamp_match = EVENT_TIMESTAMP_RE.match(event)
             timestamp = timestamp_match.group(1) if timestamp_match else 'Unknown time'
             summary += f"    - {timestamp} CAN issue detected\n"
     else:
@@ -946,7 +1396,7 @@ def format_metrics_summary(metrics) -> str:
     if metrics.protocol_timeouts:
         summary += f"  - **Protocols**: {len(metrics.protocol_timeouts)} protocol timeouts detected\n"
         for timeout in metrics.protocol_timeouts[:3]:
-            timestamp_match = re.match(r'(\d{2}\.\d{2}\.\d{4}\s+\d{2}:\d{2}:\d{2}(?:\.\d{3,6})?)', timeout)
+            timestamp_match = EVENT_TIMESTAMP_RE.match(timeout)
             timestamp = timestamp_match.group(1) if timestamp_match else 'Unknown time'
             summary += f"    - {timestamp} Protocol timeout\n"
     else:
@@ -984,6 +1434,195 @@ def format_metrics_summary(metrics) -> str:
 # Streamlit UI
 # ===============================
 
+def format_processing_stats(stats: dict) -> Dict[str, Any]:
+    """
+    Format the sidebar figures of processing_stats, reusing them across reruns.
+    
+    Streamlit reruns the whole script on every interaction, so the formatted
+    strings are memoized on st.session_state and only rebuilt when the stats
+    (or their cost summary, which is replaced after each follow-up) change.
+    The memo keeps references to both objects, so the identity check cannot
+    be fooled by a recycled id().
+    
+    Args:
+        stats: st.session_state.processing_stats
+        
+    Returns:
+        Dict[str, Any]: Pre-formatted strings (and display flags) keyed by sidebar field
+    """
+    cost_data = stats.get('cost')
+    memo = st.session_state.get('_formatted_stats')
+    if memo is not None and memo[0] is stats and memo[1] is cost_data:
+        return memo[2]
+    
+    formatted = {
+        'strategy': stats.get('strategy', 'N/A'),
+        'tokens_label': "Total Tokens (estimated)" if stats.get('tokens_estimated') else "Total Tokens",
+        'tokens': f"{stats.get('tokens', 0):,}",
+        'files': str(stats.get('files', 0)),
+    }
+    if 'reduction' in stats:
+        formatted['reduction'] = f"{stats['reduction']:.1f}%"
+    
+    if cost_data:
+        api_calls = cost_data.get('api_calls', 0)
+        input_tokens = cost_data.get('input_tokens', 0)
+        output_tokens = cost_data.get('output_tokens', 0)
+        total_tokens = cost_data.get('total_tokens', input_tokens + output_tokens)
+        
+        formatted.update({
+            'api_calls': str(api_calls),
+            'cache_hits': str(cost_data.get('cache_hits', 0)),
+            'cache_misses': str(cost_data.get('cache_misses', 0)),
+            'show_cache': bool(cost_data.get('cache_hits', 0) or cost_data.get('cache_misses', 0)),
+            'input_tokens': f"{input_tokens:,}",
+            'output_tokens': f"{output_tokens:,}",
+            'total_tokens': f"{total_tokens:,}",
+        })
+        
+        if 'cost' in cost_data:
+            cost_breakdown = cost_data['cost']
+            total_cost = cost_breakdown.get('total_cost', 0)
+            formatted.update({
+                'total_cost': f"${total_cost:.4f}",
+                'input_cost': f"${cost_breakdown.get('input_cost', 0):.4f}",
+                'output_cost': f"${cost_breakdown.get('output_cost', 0):.4f}",
+                'model': cost_breakdown.get('model', 'N/A'),
+                'processing_method': cost_breakdown.get('processing_method', 'N/A'),
+                'avg_cost': f"${(total_cost/api_calls):.4f}" if api_calls > 1 else None,
+            })
+    
+    st.session_state['_formatted_stats'] = (stats, cost_data, formatted)
+    return formatted
+
+
+def render_processing_stats(slot, stats: Optional[dict]):
+    """
+    Render the "Last Processing" and cost summary of the sidebar into a placeholder.
+    
+    Rendering into an st.empty() slot lets the figures be refreshed in place,
+    e.g. after a follow-up answer, without rerunning the whole script. The
+    strings themselves come pre-formatted from format_processing_stats().
+    
+    Args:
+        slot: st.empty() placeholder in the sidebar
+        stats: st.session_state.processing_stats (nothing is shown when empty)
+    """
+    with slot.container():
+        if stats:
+            fmt = format_processing_stats(stats)
+            st.markdown("---")
+            st.markdown("### 📈 Last Processing")
+            
+            # Display strategy with color indicator
+            strategy = fmt['strategy']
+            if 'Direct' in strategy:
+                st.success(f"🟢 **Strategy:** {strategy}")
+            else:
+                st.warning(f"🟡 **Strategy:** {strategy}")
+            
+            # Basic stats
+            st.metric(fmt['tokens_label'], fmt['tokens'])
+            st.metric("Files Processed", fmt['files'])
+            
+            if 'reduction' in fmt:
+                st.metric("Token Reduction", fmt['reduction'])
+            
+            # Display cost information
+            if 'api_calls' in fmt:
+                st.markdown("---")
+                st.markdown("### 💰 Cost Summary")
+                
+                # Display API calls
+                st.metric("🔄 API Calls", fmt['api_calls'])
+                
+                # Display response cache usage (repeated requests are not billed)
+                if fmt['show_cache']:
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.metric("♻️ Cache Hits", fmt['cache_hits'])
+                    with col2:
+                        st.metric("📡 Cache Misses", fmt['cache_misses'])
+                
+                # Display tokens
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("📥 Input Tokens", fmt['input_tokens'])
+                with col2:
+                    st.metric("📤 Output Tokens", fmt['output_tokens'])
+                
+                st.metric("📊 Total Tokens", fmt['total_tokens'])
+                
+                # Display cost
+                if 'total_cost' in fmt:
+                    st.metric(
+                        "💵 Total Cost",
+                        fmt['total_cost'],
+                        help=f"Using model: {fmt['model']}"
+                    )
+                    
+                    # Cost breakdown
+                    with st.expander("💡 Detailed Cost Breakdown"):
+                        st.write(f"**Model Used:** {fmt['model']}")
+                        st.write(f"**🎯 Processing Method:** {fmt['processing_method']}")
+                        st.write(f"**Input Cost:** {fmt['input_cost']} ({fmt['input_tokens']} tokens)")
+                        st.write(f"**Output Cost:** {fmt['output_cost']} ({fmt['output_tokens']} tokens)")
+                        st.write(f"**Total Cost:** {fmt['total_cost']}")
+                        
+                        if fmt['avg_cost']:
+                            st.write(f"**Average per call:** {fmt['avg_cost']}")
+                else:
+                    st.warning("Cost calculation pending...")
+
+
+def get_api_key() -> Optional[str]:
+    """
+    Return the OpenAI API key, reading st.secrets only once per session.
+    
+    The key is cached on st.session_state so reruns do not go back to the
+    secrets store. A missing key is not cached, so adding it to the secrets
+    later takes effect without restarting the session.
+    
+    Returns:
+        Optional[str]: The API key, or None when it is not configured
+        
+    Note:
+        st.secrets raises FileNotFoundError (StreamlitSecretNotFoundError)
+        when no secrets.toml exists at all, and KeyError when the file
+        exists but has no OPENAI_API_KEY entry.
+    """
+    if st.session_state.get('api_key') is None:
+        try:
+            st.session_state.api_key = st.secrets["OPENAI_API_KEY"]
+        except (KeyError, FileNotFoundError):
+            return None
+    return st.session_state.api_key
+
+
+@st.cache_resource(show_spinner=False)
+def get_openai_client(api_key: str) -> "OpenAI":
+    """
+    Return an OpenAI client shared by all sessions using the same API key.
+    
+    The client is stateless apart from its HTTP connection pool, so sharing it
+    lets later sessions (and new handlers after a model switch) reuse warm
+    connections instead of constructing a client and handshaking again.
+    
+    Args:
+        api_key: OpenAI API key from get_api_key()
+        
+    Returns:
+        OpenAI: Cached client for the key
+        
+    Note:
+        - The LLMHandler itself stays per session: it holds the token and
+          cost counters shown in that session's sidebar
+    """
+    # Imported here so the openai package is only loaded once a client is needed
+    from openai import OpenAI
+    return OpenAI(api_key=api_key)
+
+
 def main():
     """Main application entry point"""
     
@@ -1007,7 +1646,7 @@ def main():
     - ID-based turbo filtering for files over 500,000 tokens with over 95% noise reduction
     - Critical event preservation - All errors, warnings, and measurements kept
     - Ultra-fast preprocessing removes obvious noise in seconds
-    - Adaptive chunking with up to 28K tokens for very large files (within rate limits)
+    - Adaptive chunk sizes that grow with measured API latency headroom (within rate limits)
     - Interactive chat for follow-up questions on all processed files
     - Real-time cost tracking with optimized token usage
     - Optional metrics-only mode for instant, zero-cost analysis
@@ -1021,6 +1660,12 @@ def main():
     
     with col1:
         st.markdown("### 🔧 Processing Options")
+        batch_mode = st.checkbox(
+            "📨 Batch API mode for large files",
+            value=False,
+            help=f"Files over {TOKEN_THRESHOLD_TURBO_FILTERING:,} tokens are summarized through the "
+                 "OpenAI Batch API: 50% cheaper, results within 24 hours"
+        )
     
     with col2:
         force_metrics = False  # Metrics-only mode removed from UI
@@ -1058,77 +1703,13 @@ def main():
         st.caption(f"🟢 Direct: < {TOKEN_THRESHOLD_FILTERING:,} tokens")
         st.caption(f"🔍 Basic Filtered: {TOKEN_THRESHOLD_FILTERING:,} - {TOKEN_THRESHOLD_TURBO_FILTERING:,} tokens")
         st.caption(f"🚀 ID-Based Turbo: > {TOKEN_THRESHOLD_TURBO_FILTERING:,} tokens (intelligent filtering)")
+        # Chunk size follows the latency measured on earlier calls to the selected model
+        from llm_handler import get_chunk_sizer
+        st.caption(f"📦 Chunk size: up to {get_chunk_sizer(model_option).chunk_tokens():,} tokens (adapts to API latency)")
         
-        if st.session_state.get("processing_stats"):
-            st.markdown("---")
-            st.markdown("### 📈 Last Processing")
-            stats = st.session_state.processing_stats
-            
-            # Display strategy with color indicator
-            strategy = stats.get('strategy', 'N/A')
-            if 'Direct' in strategy:
-                st.success(f"🟢 **Strategy:** {strategy}")
-            else:
-                st.warning(f"🟡 **Strategy:** {strategy}")
-            
-            # Basic stats
-            st.metric("Total Tokens", f"{stats.get('tokens', 0):,}")
-            st.metric("Files Processed", stats.get('files', 0))
-            
-            if 'reduction' in stats:
-                st.metric("Token Reduction", f"{stats['reduction']:.1f}%")
-            
-            # Display cost information
-            if 'cost' in stats and stats['cost']:
-                st.markdown("---")
-                st.markdown("### 💰 Cost Summary")
-                cost_data = stats['cost']
-                
-                # Display API calls
-                api_calls = cost_data.get('api_calls', 0)
-                st.metric("🔄 API Calls", api_calls)
-                
-                # Display tokens
-                input_tokens = cost_data.get('input_tokens', 0)
-                output_tokens = cost_data.get('output_tokens', 0)
-                total_tokens = cost_data.get('total_tokens', input_tokens + output_tokens)
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric("📥 Input Tokens", f"{input_tokens:,}")
-                with col2:
-                    st.metric("📤 Output Tokens", f"{output_tokens:,}")
-                
-                st.metric("📊 Total Tokens", f"{total_tokens:,}")
-                
-                # Display cost
-                if 'cost' in cost_data:
-                    cost_breakdown = cost_data['cost']
-                    total_cost = cost_breakdown.get('total_cost', 0)
-                    input_cost = cost_breakdown.get('input_cost', 0)
-                    output_cost = cost_breakdown.get('output_cost', 0)
-                    model_used = cost_breakdown.get('model', 'N/A')
-                    processing_method = cost_breakdown.get('processing_method', 'N/A')
-                    
-                    st.metric(
-                        "💵 Total Cost",
-                        f"${total_cost:.4f}",
-                        help=f"Using model: {model_used}"
-                    )
-                    
-                    # Cost breakdown
-                    with st.expander("💡 Detailed Cost Breakdown"):
-                        st.write(f"**Model Used:** {model_used}")
-                        st.write(f"**🎯 Processing Method:** {processing_method}")
-                        st.write(f"**Input Cost:** ${input_cost:.4f} ({input_tokens:,} tokens)")
-                        st.write(f"**Output Cost:** ${output_cost:.4f} ({output_tokens:,} tokens)")
-                        st.write(f"**Total Cost:** ${total_cost:.4f}")
-                        
-                        if api_calls > 1:
-                            st.write(f"**Average per call:** ${(total_cost/api_calls):.4f}")
-                else:
-                    st.warning("Cost calculation pending...")
-
+        # Placeholder so the stats can be refreshed in place after a follow-up answer
+        stats_slot = st.empty()
+        render_processing_stats(stats_slot, st.session_state.get("processing_stats"))
     
     # File uploader
     uploaded_files = st.file_uploader(
@@ -1143,24 +1724,33 @@ def main():
         st.session_state.messages = []
         st.session_state.summarized = False
         st.session_state.processing_stats = {}
-        st.session_state.last_files = []
+        st.session_state._files_key = ()
+    
+    # Remove files of sessions lost in a server crash (once per process)
+    sweep_stale_session_files()
     
     # Auto-refresh when files are removed
-    if not uploaded_files and st.session_state.get("last_files"):
+    if not uploaded_files and st.session_state.get("_files_key"):
         # Files were removed - clear state and refresh
         st.session_state.messages = []
         st.session_state.summarized = False
         st.session_state.processing_stats = {}
-        st.session_state.last_files = []
+        st.session_state._files_key = ()
+        st.session_state.pop('pending_batch', None)
+        clear_session_files()
         st.rerun()
     
     # Reset state if files change
     if uploaded_files:
-        current_files = [f.name for f in uploaded_files]
-        if st.session_state.get("last_files") != current_files:
+        # file_id is unique per upload, so re-uploading a file with the same
+        # name but different content is detected as a change as well
+        files_key = tuple(f.file_id for f in uploaded_files)
+        if st.session_state.get("_files_key") != files_key:
             st.session_state.messages = []
             st.session_state.summarized = False
-            st.session_state.last_files = current_files
+            st.session_state._files_key = files_key
+            st.session_state.pop('pending_batch', None)
+            clear_session_files()
         
         # Show file info and auto-refresh note
         st.info(f"📁 {len(uploaded_files)} file(s) uploaded. Click ❌ to remove files and auto-refresh the page.")
@@ -1168,14 +1758,14 @@ def main():
     # Main processing
     if uploaded_files and not st.session_state.summarized:
         # Initialize LLM handler
-        try:
-            api_key = st.secrets["OPENAI_API_KEY"]
-        except:
+        api_key = get_api_key()
+        if api_key is None:
             st.error("⚠️ OpenAI API key not found in secrets. Please configure it.")
             st.stop()
         
         # Create LLM handler (even for metrics-only mode for compatibility)
-        llm_handler = LLMHandler(api_key, model=model_option)
+        from llm_handler import LLMHandler
+        llm_handler = LLMHandler(api_key, model=model_option, client=get_openai_client(api_key))
         
         # Progress container
         status_container = st.empty()
@@ -1201,10 +1791,20 @@ def main():
             # Combine logs
             update_progress("🔗 Combining log files...", 0.3)
             log_content = combine_log_files(log_files)
+            # The combined content holds a copy of every file; release the per-file
+            # texts so they are not kept alongside it for the rest of the run
+            file_count = len(log_files)
+            del log_files
             
-            # Count initial tokens
-            initial_tokens = count_tokens(log_content, "gpt-4")
-            update_progress(f"📊 Counted {initial_tokens:,} tokens", 0.4)
+            # Count initial tokens (fast estimate unless close to a tier boundary).
+            # An exact count uses the analysis model's tokenizer, so the Direct tier's
+            # chunking decision finds it in the token count cache instead of
+            # encoding the whole log a second time with another encoding
+            initial_tokens, tokens_estimated = count_routing_tokens(log_content, llm_handler.model)
+            if tokens_estimated:
+                update_progress(f"📊 Estimated ~{initial_tokens:,} tokens", 0.4)
+            else:
+                update_progress(f"📊 Counted {initial_tokens:,} tokens", 0.4)
             
             # Determine strategy
             if force_metrics:
@@ -1225,11 +1825,13 @@ def main():
                 update_progress(msg, 0.7)
             
             # Process logs
-            reply = process_logs_smart(
+            reply, llm_input_tokens = process_logs_smart(
                 log_content, 
                 llm_handler, 
                 progress_with_bar,
-                force_metrics_only=force_metrics
+                force_metrics_only=force_metrics,
+                batch_mode=batch_mode,
+                total_tokens=initial_tokens
             )
             
             # Store results
@@ -1255,20 +1857,17 @@ def main():
                     }
                 }
             
-            # Store stats with detailed reduction information
+            # Store stats with detailed reduction information: filtered tiers report
+            # how much smaller the content sent to the LLM was than the raw logs
             reduction_percentage = 0
-            if strategy == "ID-Based Turbo + LLM" and initial_tokens >= TOKEN_THRESHOLD_TURBO_FILTERING:
-                # For turbo mode, calculate the total reduction
-                final_tokens = count_tokens(reply, llm_handler.model) if not force_metrics else 0
-                reduction_percentage = (1 - final_tokens / initial_tokens) * 100 if initial_tokens > 0 else 0
-            elif strategy == "Basic Filtered + LLM":
-                # Estimate reduction for basic filtering
-                reduction_percentage = 40  # Typical basic filtering reduction
+            if strategy in ("ID-Based Turbo + LLM", "Basic Filtered + LLM") and initial_tokens > 0:
+                reduction_percentage = max(0.0, (1 - llm_input_tokens / initial_tokens) * 100)
             
             st.session_state.processing_stats = {
                 'tokens': initial_tokens,
+                'tokens_estimated': tokens_estimated,
                 'strategy': strategy,
-                'files': len(log_files),
+                'files': file_count,
                 'reduction': reduction_percentage,
                 'cost': usage_stats
             }
@@ -1321,17 +1920,42 @@ def main():
                 with st.chat_message("user"):
                     st.markdown(msg["content"])
         
+        # Pending Batch API job: poll on demand and replace the placeholder when done
+        if st.session_state.get('pending_batch'):
+            if st.button("🔄 Check batch status"):
+                try:
+                    with st.spinner("Checking batch..."):
+                        llm_handler = st.session_state.llm_handler
+                        status, summary = collect_batch_summary(llm_handler)
+                    
+                    if summary is not None:
+                        # messages[1] holds the "Submitted to the Batch API" placeholder
+                        st.session_state.messages[1] = {"role": "assistant", "content": summary}
+                        st.session_state.pop('pending_batch')
+                        st.session_state.processing_stats['cost'] = llm_handler.get_usage_stats()
+                        st.rerun()
+                    elif status in ("failed", "expired", "cancelled"):
+                        st.session_state.pop('pending_batch')
+                        st.error(f"❌ Batch {status}. Please re-run the analysis.")
+                    else:
+                        st.info(f"⏳ Batch status: {status}")
+                except Exception as e:
+                    st.error(f"Error: {str(e)}")
+        
         # Chat input for follow-up questions
         st.markdown("---")
         st.subheader("💬 Ask Follow-up Questions")
         
-        # Check if LLM is available for follow-up
-        if st.session_state.get('llm_handler') is None and st.session_state.processing_stats.get('strategy', '').startswith('Metrics-only'):
+        # Check if LLM is available for follow-up (not before a batch summary exists)
+        batch_pending = bool(st.session_state.get('pending_batch'))
+        if batch_pending:
+            st.info("⏳ **Chat Pending**: Follow-up questions open once the batch summary has been retrieved.")
+        elif st.session_state.get('llm_handler') is None and st.session_state.processing_stats.get('strategy', '').startswith('Metrics-only'):
             st.info("💡 **Note**: Follow-up questions require LLM processing. Metrics-only analysis doesn't support chat.")
         elif st.session_state.processing_stats.get('strategy', '').endswith('+ LLM'):
             st.info("✅ **Chat Available**: This file was processed with LLM analysis - ask questions about the logs!")
         
-        if prompt := st.chat_input("Ask a question about the logs..."):
+        if prompt := st.chat_input("Ask a question about the logs...", disabled=batch_pending):
             # Check if we have LLM handler
             if 'llm_handler' not in st.session_state or st.session_state.llm_handler is None:
                 if st.session_state.processing_stats.get('strategy', '').startswith('Metrics-only'):
@@ -1339,8 +1963,13 @@ def main():
                 else:
                     # Try to create new LLM handler
                     try:
-                        api_key = st.secrets["OPENAI_API_KEY"]
-                        st.session_state.llm_handler = LLMHandler(api_key, model=model_option)
+                        api_key = get_api_key()
+                        if api_key is None:
+                            raise KeyError("OPENAI_API_KEY not found in secrets")
+                        from llm_handler import LLMHandler
+                        st.session_state.llm_handler = LLMHandler(
+                            api_key, model=model_option, client=get_openai_client(api_key)
+                        )
                     except Exception as e:
                         st.error(f"❌ Could not initialize LLM handler: {str(e)}")
                         st.stop()
@@ -1351,25 +1980,28 @@ def main():
             with st.chat_message("user"):
                 st.markdown(prompt)
             
-            # Get LLM response
+            # Get LLM response, rendered as it streams in
             with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    try:
-                        llm_handler = st.session_state.llm_handler
-                        reply = llm_handler.answer_question(st.session_state.messages)
-                        st.session_state.messages.append({"role": "assistant", "content": reply})
-                        st.markdown(reply, unsafe_allow_html=True)
-                        
-                        # Update cost stats
-                        usage_stats = llm_handler.get_usage_stats()
-                        if 'processing_stats' in st.session_state:
-                            st.session_state.processing_stats['cost'] = usage_stats
+                try:
+                    llm_handler = st.session_state.llm_handler
+                    reply_slot = st.empty()
+                    with reply_slot.container():
+                        reply = st.write_stream(llm_handler.stream_answer(st.session_state.messages))
+                    # Replies carry <span style=...> markup; re-render once complete so
+                    # it is shown as HTML like the rest of the history
+                    reply_slot.markdown(reply, unsafe_allow_html=True)
+                    st.session_state.messages.append({"role": "assistant", "content": reply})
+                    
+                    # Update cost stats
+                    usage_stats = llm_handler.get_usage_stats()
+                    if 'processing_stats' in st.session_state:
+                        st.session_state.processing_stats['cost'] = usage_stats
+                    
+                    # Refresh the sidebar cost summary in place
+                    render_processing_stats(stats_slot, st.session_state.get('processing_stats'))
                         
-                        # Force sidebar to refresh by triggering a rerun
-                        st.rerun()
-                            
-                    except Exception as e:
-                        st.error(f"Error: {str(e)}")
+                except Exception as e:
+                    st.error(f"Error: {str(e)}")
     
     elif not uploaded_files:
         st.info("⬆️ Upload your `.LOG` files or `.ZIP` archives above to begin.")